@@ -0,0 +1,129 @@
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_SHED
+
+
+class Overloaded(Exception):
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(f"{priority} request shed")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class PriorityClass:
+    """Admission policy for one class of routes; lower `rank` is served first.
+
+    `exempt` classes are admitted immediately, whatever the load. Others wait in a
+    queue of at most `queue` requests for up to `max_wait` seconds, and are shed
+    with `retry_after` when either is exceeded.
+    """
+
+    def __init__(self, rank: int, limit: Optional[int] = None, queue: int = 0, max_wait: float = 0.0,
+                 retry_after: int = 1, exempt: bool = False):
+        self.rank = rank
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.exempt = exempt
+
+
+class AdmissionController:
+    """Caps requests in flight at `capacity`, handing freed slots out by priority.
+
+    Exempt requests (SOS) still count towards the total, so a burst of them squeezes
+    out lower classes instead of the other way round.
+    """
+
+    def __init__(self, capacity: int, classes: Dict[str, PriorityClass]):
+        self.capacity = capacity
+        self.classes = classes
+        self.by_rank = sorted(classes, key=lambda name: classes[name].rank)
+        self.in_flight = 0
+        self.running: Dict[str, int] = defaultdict(int)
+        self.waiting: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in classes}
+        self.admitted: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, int] = defaultdict(int)
+
+    def _fits(self, name: str) -> bool:
+        limit = self.classes[name].limit
+        return self.in_flight < self.capacity and (limit is None or self.running[name] < limit)
+
+    def _ahead(self, name: str) -> bool:
+        rank = self.classes[name].rank
+        return any(self.waiting[other] for other in self.by_rank if self.classes[other].rank <= rank)
+
+    def _start(self, name: str) -> None:
+        self.in_flight += 1
+        self.running[name] += 1
+        self.admitted[name] += 1
+        ADMISSION_IN_FLIGHT.labels(name).inc()
+
+    def _shed(self, name: str) -> Overloaded:
+        self.shed[name] += 1
+        ADMISSION_SHED.labels(name).inc()
+        return Overloaded(name, self.classes[name].retry_after)
+
+    async def acquire(self, name: str) -> None:
+        policy = self.classes[name]
+        if policy.exempt or (self._fits(name) and not self._ahead(name)):
+            self._start(name)
+            return
+        queue = self.waiting[name]
+        if len(queue) >= policy.queue:
+            raise self._shed(name)
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        ADMISSION_QUEUED.labels(name).inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), policy.max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                raise self._shed(name)
+        except asyncio.CancelledError:
+            if waiter.done():
+                # Admitted just as the client went away; hand the slot back.
+                self.release(name)
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            if waiter in queue:
+                queue.remove(waiter)
+                ADMISSION_QUEUED.labels(name).dec()
+
+    def release(self, name: str) -> None:
+        self.in_flight -= 1
+        self.running[name] -= 1
+        ADMISSION_IN_FLIGHT.labels(name).dec()
+        self._wake()
+
+    def _wake(self) -> None:
+        for name in self.by_rank:
+            queue = self.waiting[name]
+            while queue and self._fits(name):
+                waiter = queue.popleft()
+                ADMISSION_QUEUED.labels(name).dec()
+                if not waiter.done():
+                    self._start(name)
+                    waiter.set_result(None)
+            if self.in_flight >= self.capacity:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "classes": {
+                name: {
+                    "running": self.running[name],
+                    "queued": len(self.waiting[name]),
+                    "admitted": self.admitted[name],
+                    "shed": self.shed[name],
+                }
+                for name in self.by_rank
+            },
+        }
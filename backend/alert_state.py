@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+from cache import TTLCache
+
+
+def etag_for(body: Optional[str]) -> str:
+    return '"' + hashlib.sha1((body or "null").encode()).hexdigest()[:20] + '"'
+
+
+class ActiveAlertCache:
+    """Per-user cache of the current active alert (or none) with its ETag.
+
+    Writers call `set`/`invalidate`; long-pollers block in `wait_for_change` until
+    the user's entry changes or the timeout passes.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 10.0):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+
+    def get(self, user_id: str) -> Optional[Tuple[Any, str]]:
+        return self.entries.get(user_id)
+
+    def set(self, user_id: str, alert: Any, body: Optional[str]) -> Tuple[Any, str]:
+        previous = self.entries.get(user_id)
+        entry = (alert, etag_for(body))
+        self.entries.set(user_id, entry)
+        if previous is None or previous[1] != entry[1]:
+            self._notify(user_id)
+        return entry
+
+    def invalidate(self, user_id: str) -> None:
+        self.entries.pop(user_id)
+        self._notify(user_id)
+
+    def _notify(self, user_id: str) -> None:
+        event = self._changed.pop(user_id, None)
+        if event is not None:
+            event.set()
+
+    async def wait_for_change(self, user_id: str, timeout: float) -> bool:
+        event = self._changed.setdefault(user_id, asyncio.Event())
+        self._waiters[user_id] = self._waiters.get(user_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            # The last waiter to leave drops the event, so timed-out polls don't pile up.
+            waiters = self._waiters.pop(user_id) - 1
+            if waiters:
+                self._waiters[user_id] = waiters
+            elif self._changed.get(user_id) is event:
+                del self._changed[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.entries.stats(), "waiting_users": len(self._changed)}
@@ -0,0 +1,106 @@
+"""Cold-start budget for importing the app module, measured with `python -X importtime`.
+
+Each run imports `server` in a fresh interpreter; the median cumulative import time
+is compared against benchmarks/import_budget.json. The run fails (exit 1) if it
+exceeds the budget by more than the recorded tolerance, or if a module that must
+be loaded lazily (the LLM SDK stack) is imported at startup.
+
+    cd backend
+    python benchmarks/bench_import.py              # check against the budget
+    python benchmarks/bench_import.py --record     # re-baseline after an intended change
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BUDGET_PATH = Path(__file__).resolve().parent / "import_budget.json"
+
+# Only the distress routes need these; importing them at startup is a regression.
+LAZY_MODULES = ("emergentintegrations", "litellm", "openai", "google.generativeai", "google.genai")
+
+
+def import_once() -> Tuple[float, List[Tuple[int, float, str]]]:
+    """Import `server` in a new interpreter; returns (server cumulative ms, [(depth, cumulative ms, module)])."""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "bench_import")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"importing server failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        modules.append((depth, int(cumulative) / 1000, name.strip()))
+    server_ms = next(ms for depth, ms, name in modules if depth == 0 and name == "server")
+    return server_ms, modules
+
+
+def heaviest(modules: List[Tuple[int, float, str]], limit: int) -> List[Tuple[float, str]]:
+    # importtime lists children before their parent: server's direct imports are the
+    # depth-1 entries between the preceding top-level import and server itself.
+    direct = []
+    for depth, ms, name in modules:
+        if depth == 0:
+            if name == "server":
+                break
+            direct = []
+        elif depth == 1:
+            direct.append((ms, name))
+    return sorted(direct, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=12, help="show the N slowest direct imports")
+    parser.add_argument("--record", action="store_true", help="write the measured median as the new budget")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown when recording")
+    args = parser.parse_args()
+
+    timings = []
+    modules: List[Tuple[int, float, str]] = []
+    for _ in range(args.runs):
+        server_ms, modules = import_once()
+        timings.append(server_ms)
+    median = statistics.median(timings)
+
+    print(f"import server: median {median:.1f} ms over {args.runs} runs (min {min(timings):.1f}, max {max(timings):.1f})")
+    for ms, name in heaviest(modules, args.top):
+        print(f"  {ms:8.1f} ms  {name}")
+
+    eager = sorted({name for _, _, name in modules if name.split(".")[0] in LAZY_MODULES or name in LAZY_MODULES})
+    if eager:
+        print(f"FAIL lazily loaded modules imported at startup: {', '.join(eager[:10])}")
+
+    if args.record:
+        with open(BUDGET_PATH, "w") as f:
+            json.dump({"server_import_ms": round(median, 1), "tolerance": args.tolerance}, f, indent=2)
+            f.write("\n")
+        print(f"recorded budget {median:.1f} ms (+{args.tolerance:.0%}) to {BUDGET_PATH.name}")
+        sys.exit(1 if eager else 0)
+
+    with open(BUDGET_PATH) as f:
+        budget: Dict[str, float] = json.load(f)
+    limit = budget["server_import_ms"] * (1 + budget["tolerance"])
+    over = median > limit
+    print(f"budget {budget['server_import_ms']} ms +{budget['tolerance']:.0%} = {limit:.1f} ms: {'FAIL' if over else 'ok'}")
+    sys.exit(1 if over or eager else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Login (/api/auth/session) throughput against the local OAuth stub.
+
+Needs a reachable Mongo (MONGO_URL, default mongodb://localhost:27017); users and
+sessions are written to DB_NAME (default safeher_bench).
+
+    cd backend && python benchmarks/bench_login.py [--requests 500] [--concurrency 20] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "safeher_bench")
+
+import httpx  # noqa: E402
+
+from stub_oauth import running_stub  # noqa: E402
+
+
+async def run(requests: int, concurrency: int):
+    import server
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=server.app)
+
+    async with server.lifespan(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as api:
+            async def login():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await api.get("/api/auth/session", headers={"X-Session-ID": uuid.uuid4().hex[:12]})
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(requests)))
+            elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"logins:     {requests} at concurrency {concurrency}")
+    print(f"throughput: {requests / elapsed:.1f} logins/s")
+    print(f"latency ms: p50 {statistics.median(latencies) * 1e3:.1f}  "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1e3:.1f}  p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated OAuth service latency")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with running_stub(args.port, args.latency_ms) as url:
+        os.environ["OAUTH_SESSION_URL"] = url
+        asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
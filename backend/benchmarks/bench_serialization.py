@@ -0,0 +1,97 @@
+"""Per-row serialization cost of list endpoints: response_model path vs. FAST_RESPONSES path.
+
+    cd backend && python benchmarks/bench_serialization.py [--rows 500] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from models import CommunityReport, EmergencyContact, SafetyZone  # noqa: E402
+from server import contact_rows, report_rows, zone_rows  # noqa: E402
+
+
+def make_rows(n: int):
+    now = datetime.now(timezone.utc)
+    reports = [{
+        "report_id": f"report_{uuid.uuid4().hex[:12]}",
+        "user_id": None,
+        "type": "harassment",
+        "severity": i % 5 + 1,
+        "location": {"latitude": 28.6 + i * 1e-4, "longitude": 77.2 + i * 1e-4},
+        "description": "Followed by a group near the metro exit after dark",
+        "timestamp": now - timedelta(minutes=i),
+        "anonymous": True,
+        "status": "pending",
+    } for i in range(n)]
+    contacts = [{
+        "contact_id": f"contact_{uuid.uuid4().hex[:12]}",
+        "user_id": "user_bench",
+        "name": f"Contact {i}",
+        "relationship": "friend",
+        "phone": "+91-98765-43210",
+        "email": f"contact{i}@example.com",
+        "is_primary": i == 0,
+        "created_at": now,
+    } for i in range(n)]
+    zones = [{
+        "zone_id": f"zone_{uuid.uuid4().hex[:12]}",
+        "name": f"Zone {i}",
+        "type": "police_station",
+        "location": {"latitude": 28.6, "longitude": 77.2},
+        "address": "Connaught Place, New Delhi",
+        "contact": "+91-11-23412345",
+        "hours": "24/7",
+        "verified": True,
+        "facilities": ["police", "first_aid"],
+    } for i in range(n)]
+    return {"reports": (CommunityReport, report_rows, reports),
+            "contacts": (EmergencyContact, contact_rows, contacts),
+            "zones": (SafetyZone, zone_rows, zones)}
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<10} {'validated us/row':>17} {'fast us/row':>12} {'speedup':>8}")
+    for name, (model, trusted, rows) in make_rows(args.rows).items():
+        adapter = TypeAdapter(List[model])
+
+        # What FastAPI does with response_model: validate, dump to JSON-able python, stdlib json.dumps.
+        def validated():
+            return JSONResponse(adapter.dump_python(adapter.validate_python(rows), mode="json")).body
+
+        def fast():
+            return trusted.response(rows).body
+
+        assert json.loads(validated()) == json.loads(fast()), f"{name}: fast path output differs"
+        before = timed(validated, args.repeat) / args.rows * 1e6
+        after = timed(fast, args.repeat) / args.rows * 1e6
+        print(f"{name:<10} {before:>17.2f} {after:>12.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Precision/recall and latency of the local distress pre-screen against the labelled fixtures.
+
+    cd backend && python benchmarks/eval_prescreen.py [--fixtures fixtures/distress_labelled.jsonl]
+
+Exits non-zero if urgent precision or benign precision drop below the given floors, or if
+any labelled distress text is answered locally as benign. Rows marked "held_out" were
+written independently of the lexicon (paraphrases, no keyword hits, Hinglish) and are
+reported separately: the lexicon was tuned on the rest, so only these say anything
+about texts it has never seen.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from prescreen import prescreen  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=str(BACKEND_DIR / "fixtures" / "distress_labelled.jsonl"))
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--min-urgent-precision", type=float, default=0.95)
+    parser.add_argument("--min-benign-precision", type=float, default=0.95)
+    args = parser.parse_args()
+
+    with open(args.fixtures) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    urgent_tp = urgent_fp = benign_tn = benign_fn = escalated = 0
+    missed = []
+    held_out = held_out_local = 0
+    for row in rows:
+        result = prescreen(row["text"])
+        if row.get("held_out") and row["distress"]:
+            held_out += 1
+            held_out_local += result is not None
+        if result is None:
+            escalated += 1
+        elif result["distress_level"] > 0:
+            urgent_tp += row["distress"]
+            urgent_fp += not row["distress"]
+        else:
+            benign_tn += not row["distress"]
+            benign_fn += row["distress"]
+            if row["distress"]:
+                missed.append(row["text"])
+
+    positives = sum(row["distress"] for row in rows)
+    urgent_precision = urgent_tp / (urgent_tp + urgent_fp) if urgent_tp + urgent_fp else 1.0
+    benign_precision = benign_tn / (benign_tn + benign_fn) if benign_tn + benign_fn else 1.0
+
+    timings = []
+    for _ in range(args.repeat):
+        for row in rows:
+            start = time.perf_counter()
+            prescreen(row["text"])
+            timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+
+    print(f"fixtures:              {len(rows)} ({positives} distress)")
+    print(f"answered locally:      {len(rows) - escalated} ({(len(rows) - escalated) / len(rows):.0%}), escalated {escalated}")
+    print(f"urgent precision:      {urgent_precision:.3f}  recall {urgent_tp / positives if positives else 0:.3f}")
+    print(f"benign precision:      {benign_precision:.3f}  recall {benign_tn / (len(rows) - positives) if len(rows) > positives else 0:.3f}")
+    print(f"held-out distress:     {held_out}, answered locally {held_out_local}")
+    print(f"latency us:            mean {statistics.fmean(timings):.1f}  p50 {timings[len(timings) // 2]:.1f}  p99 {timings[int(len(timings) * 0.99)]:.1f}")
+    for text in missed:
+        print(f"MISSED DISTRESS: {text}")
+
+    if urgent_precision < args.min_urgent_precision or benign_precision < args.min_benign_precision or missed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Offline load test: drives every API route in-process and reports RPS and p50/p95/p99 per route.
+
+The app runs against a local Mongo (MONGO_URL) or, with --mongo mock, against
+mongomock-motor (`pip install mongomock-motor`; geo queries then use the in-memory
+zone index). The LLM is replaced by a stub with fixed latency and the OAuth
+session service by benchmarks/stub_oauth.py, so no network access is needed.
+
+    cd backend
+    python benchmarks/loadtest.py --mongo mock --requests 300 --concurrency 20 --output results.json
+    python benchmarks/loadtest.py --mongo mock --baseline results.json --tolerance 0.25
+
+With --baseline the run fails (exit 1) if any route's p95 grew, or its RPS dropped,
+by more than --tolerance relative to the baseline file.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx  # noqa: E402
+
+from stub_oauth import running_stub  # noqa: E402
+
+CENTER = (28.6139, 77.2090)
+
+
+def install_llm_stub(latency_ms: float) -> None:
+    """Replace the Gemini calls with canned answers after `latency_ms`."""
+    # The stubs below never touch the SDK, so don't load it (it may not even be installed).
+    os.environ["LLM_PRELOAD"] = "false"
+    import distress
+
+    answer = {"distress_level": 0.4, "triggers": ["fear"], "recommendation": "Stay in a public place"}
+
+    async def ask_llm(text, session_id):
+        await asyncio.sleep(latency_ms / 1000)
+        return distress._shape(answer)
+
+    async def ask_llm_batch(texts, session_id):
+        await asyncio.sleep(latency_ms / 1000)
+        return [distress._shape(answer) for _ in texts]
+
+    distress.ask_llm = ask_llm
+    distress.ask_llm_batch = ask_llm_batch
+
+
+def install_mongo(mode: str) -> None:
+    os.environ.setdefault("DB_NAME", "safeher_loadtest")
+    if mode == "mock":
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+        os.environ["MONGO_URL"] = "mongodb://mock"
+        # mongomock has no $geoNear; use the in-process spatial index instead.
+        os.environ.setdefault("ZONE_SPATIAL_INDEX", "memory")
+    else:
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+
+class Context:
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+
+    def auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {random.choice(self.tokens)}"}
+
+    @staticmethod
+    def point() -> Dict[str, float]:
+        return {"latitude": CENTER[0] + random.uniform(-0.05, 0.05), "longitude": CENTER[1] + random.uniform(-0.05, 0.05)}
+
+
+Call = Callable[[httpx.AsyncClient, Context], Awaitable[httpx.Response]]
+
+
+async def trigger_alert(api, ctx):
+    headers = ctx.auth()
+    alert = (await api.post("/api/emergency/trigger", headers=headers, json={"location": ctx.point()})).json()
+    return alert["alert_id"], headers
+
+
+async def replay_key(api, ctx):
+    headers = {**ctx.auth(), "Idempotency-Key": uuid.uuid4().hex}
+    await api.post("/api/emergency/trigger", headers=headers, json={"location": ctx.point()})
+    return headers
+
+
+async def create_contact(api, ctx):
+    headers = ctx.auth()
+    contact = (await api.post("/api/emergency/contacts", headers=headers, json={
+        "name": "Temp Contact", "relationship": "friend", "phone": "+91-98765-11111"})).json()
+    return contact["contact_id"], headers
+
+
+async def fresh_session(api, ctx):
+    # Logout drops every session of the user, so it gets a user of its own from the OAuth stub.
+    user = (await api.get("/api/auth/session", headers={"X-Session-ID": uuid.uuid4().hex[:12]})).json()
+    return {"Authorization": f"Bearer {user['session_token']}"}
+
+
+ROUTES: Dict[str, Dict[str, Any]] = {
+    "GET /api/": {"call": lambda api, ctx: api.get("/api/")},
+    "GET /api/auth/session": {"call": lambda api, ctx: api.get("/api/auth/session", headers={"X-Session-ID": uuid.uuid4().hex[:12]})},
+    "GET /api/auth/me": {"call": lambda api, ctx: api.get("/api/auth/me", headers=ctx.auth())},
+    "GET /api/emergency/contacts": {"call": lambda api, ctx: api.get("/api/emergency/contacts", headers=ctx.auth())},
+    "POST /api/emergency/contacts": {"call": lambda api, ctx: api.post("/api/emergency/contacts", headers=ctx.auth(), json={
+        "name": "Load Contact", "relationship": "friend", "phone": "+91-98765-43210", "email": "contact@example.com"})},
+    "POST /api/emergency/trigger": {"call": lambda api, ctx: api.post("/api/emergency/trigger", headers=ctx.auth(), json={"location": ctx.point()})},
+    "POST /api/emergency/trigger (replay)": {
+        "setup": replay_key,
+        "call": lambda api, ctx, headers: api.post("/api/emergency/trigger", headers=headers, json={"location": ctx.point()}),
+    },
+    "GET /api/emergency/active": {"call": lambda api, ctx: api.get("/api/emergency/active", headers=ctx.auth())},
+    "POST /api/auth/logout": {
+        "setup": fresh_session,
+        "call": lambda api, ctx, headers: api.post("/api/auth/logout", headers=headers),
+    },
+    "DELETE /api/emergency/contacts/{id}": {
+        "setup": create_contact,
+        "call": lambda api, ctx, prepared: api.delete(f"/api/emergency/contacts/{prepared[0]}", headers=prepared[1]),
+    },
+    "POST /api/emergency/{id}/location": {
+        "setup": trigger_alert,
+        "call": lambda api, ctx, prepared: api.post(f"/api/emergency/{prepared[0]}/location", headers=prepared[1],
+                                                    json=ctx.point()),
+    },
+    "POST /api/emergency/resolve/{id}": {
+        "setup": trigger_alert,
+        "call": lambda api, ctx, prepared: api.post(f"/api/emergency/resolve/{prepared[0]}", headers=prepared[1]),
+    },
+    "POST /api/community/reports": {"call": lambda api, ctx: api.post("/api/community/reports", headers=ctx.auth(), json={
+        "type": "harassment", "severity": random.randint(1, 5), "location": ctx.point(), "description": "load test report"})},
+    "GET /api/community/reports": {"call": lambda api, ctx: api.get("/api/community/reports", params={"limit": 50})},
+    "GET /api/community/reports/tiles": {"call": lambda api, ctx: api.get("/api/community/reports/tiles", params={
+        "south": CENTER[0] - 0.05, "west": CENTER[1] - 0.05, "north": CENTER[0] + 0.05, "east": CENTER[1] + 0.05, "zoom": 13})},
+    "GET /api/community/heatmap": {"call": lambda api, ctx: api.get("/api/community/heatmap", params={
+        "south": CENTER[0] - 0.05, "west": CENTER[1] - 0.05, "north": CENTER[0] + 0.05, "east": CENTER[1] + 0.05})},
+    "GET /api/community/reports/export": {"call": lambda api, ctx: api.get("/api/community/reports/export")},
+    "GET /api/safety/zones": {"call": lambda api, ctx: api.get("/api/safety/zones")},
+    "POST /api/safety/zones/nearby": {"call": lambda api, ctx: api.post("/api/safety/zones/nearby", params={
+        "latitude": ctx.point()["latitude"], "longitude": ctx.point()["longitude"], "radius": 5000})},
+    "POST /api/risk/score": {"call": lambda api, ctx: api.post("/api/risk/score", json={
+        "points": [ctx.point() for _ in range(25)]})},
+    "POST /api/fake-call": {"call": lambda api, ctx: api.post("/api/fake-call", headers=ctx.auth(), json={"caller_name": "Mom"})},
+    "POST /api/ai/analyze-distress": {"call": lambda api, ctx: api.post("/api/ai/analyze-distress", headers=ctx.auth(), json={
+        "text": random.choice(["I feel a bit uneasy here", "Running late, home by 8", "someone is following me help me",
+                               f"not sure about this place {random.randint(0, 50)}"])})},
+    "GET /api/admin/cache-stats": {"call": lambda api, ctx: api.get("/api/admin/cache-stats")},
+    "POST /api/ai/analyze-distress/batch": {"call": lambda api, ctx: api.post("/api/ai/analyze-distress/batch", headers=ctx.auth(), json={
+        "texts": [f"feeling uneasy on the bus {random.randint(0, 200)}" for _ in range(10)]})},
+}
+
+
+async def seed(db, users: int) -> Context:
+    now = datetime.now(timezone.utc)
+    tokens = []
+    for i in range(users):
+        user_id = f"user_load_{i}"
+        token = f"load_session_{i}_{uuid.uuid4().hex[:8]}"
+        await db.users.insert_one({"user_id": user_id, "email": f"load{i}@example.com", "name": f"Load User {i}",
+                                   "created_at": now, "emergency_settings": {}})
+        await db.user_sessions.insert_one({"user_id": user_id, "session_token": token,
+                                           "expires_at": now + timedelta(days=1), "created_at": now})
+        await db.emergency_contacts.insert_one({"contact_id": f"contact_load_{i}", "user_id": user_id, "name": "Mom",
+                                                "relationship": "mother", "phone": "+91-98765-00000", "email": None,
+                                                "is_primary": True, "created_at": now})
+        tokens.append(token)
+    return Context(tokens)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def drive(api: httpx.AsyncClient, ctx: Context, route: Dict[str, Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    queue = list(range(requests))
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            queue.pop()
+            prepared = await route["setup"](api, ctx) if "setup" in route else None
+            start = time.perf_counter()
+            try:
+                response = await (route["call"](api, ctx, prepared) if prepared is not None else route["call"](api, ctx))
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        # Wall-clock rate; for routes with a setup call (resolve) it includes the setup requests.
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1e3, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1e3, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 2),
+    }
+
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    # The trigger and alert setup routes measure fresh alerts; replays have a route of their own.
+    os.environ.setdefault("TRIGGER_DEDUPE_WINDOW", "0")
+    import server
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+    async with server.lifespan(server.app):
+        while not server.app.state.warmup["ready"]:
+            await asyncio.sleep(0.05)
+        ctx = await seed(server.db, args.users)
+        await server.seed_safety_zones()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as api:
+            for name, route in ROUTES.items():
+                if args.routes and not any(fragment in name for fragment in args.routes):
+                    continue
+                results[name] = await drive(api, ctx, route, args.requests, args.concurrency)
+                r = results[name]
+                print(f"{name:<38} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>6}")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {before['rps']} -> {current['rps']}")
+        if current["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo", choices=["local", "mock"], default="local")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--oauth-latency-ms", type=float, default=5.0)
+    parser.add_argument("--oauth-port", type=int, default=8765)
+    parser.add_argument("--routes", nargs="*", help="only run routes whose name contains one of these")
+    parser.add_argument("--output", help="write results as JSON, e.g. to use as a later --baseline")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    install_mongo(args.mongo)
+    install_llm_stub(args.llm_latency_ms)
+
+    print(f"{'route':<38} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    with running_stub(args.oauth_port, args.oauth_latency_ms) as url:
+        os.environ["OAUTH_SESSION_URL"] = url
+        results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
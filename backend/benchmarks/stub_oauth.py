@@ -0,0 +1,69 @@
+"""Local stand-in for the OAuth session-data service used by /api/auth/session.
+
+Run it standalone and point the API at it:
+
+    python benchmarks/stub_oauth.py --port 8765 --latency-ms 20
+    OAUTH_SESSION_URL=http://127.0.0.1:8765/auth/v1/env/oauth/session-data uvicorn server:app
+
+or use `running_stub()` from other benchmark scripts.
+"""
+import argparse
+import asyncio
+import contextlib
+import threading
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+SESSION_DATA_PATH = "/auth/v1/env/oauth/session-data"
+
+
+def build_app(latency_ms: float = 0.0) -> Starlette:
+    async def session_data(request: Request):
+        session_id = request.headers.get("X-Session-ID")
+        if not session_id:
+            return JSONResponse({"detail": "missing X-Session-ID"}, status_code=400)
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return JSONResponse({
+            "id": session_id,
+            "email": f"{session_id}@example.com",
+            "name": f"Stub User {session_id}",
+            "picture": "https://example.com/avatar.png",
+            "session_token": f"stub_{session_id}_{uuid.uuid4().hex}",
+        })
+
+    return Starlette(routes=[Route(SESSION_DATA_PATH, session_data)])
+
+
+@contextlib.contextmanager
+def running_stub(port: int = 8765, latency_ms: float = 0.0):
+    """Serve the stub on 127.0.0.1:`port` in a background thread; yields the session-data URL."""
+    config = uvicorn.Config(build_app(latency_ms), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}{SESSION_DATA_PATH}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(build_app(args.latency_ms), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
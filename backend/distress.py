@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
+
+from cache import TTLCache
+from metrics import track_outbound
+from prescreen import prescreen
+
+SYSTEM_MESSAGE = "You are an AI assistant analyzing text for distress signals in a women's safety app. Analyze the given text and determine if it indicates distress, danger, or emergency. Respond ONLY with a JSON object containing: {\"distress_level\": (0-1 float), \"triggers\": [array of detected triggers like 'fear', 'threat', 'violence'], \"recommendation\": \"action to take\"}. Be sensitive and accurate."
+
+BATCH_SYSTEM_MESSAGE = "You are an AI assistant analyzing text for distress signals in a women's safety app. You will receive a JSON array of texts. Analyze each one for distress, danger, or emergency. Respond ONLY with a JSON array containing exactly one object per input text, in the same order, each of the form: {\"distress_level\": (0-1 float), \"triggers\": [array of detected triggers like 'fear', 'threat', 'violence'], \"recommendation\": \"action to take\"}. Be sensitive and accurate."
+
+
+# The LLM SDK pulls in a large dependency tree; it is imported on first use (or by
+# preload_llm() after startup) so workers don't pay for it on every boot.
+LLM_MODULE = "emergentintegrations.llm.chat"
+_llm_sdk = None
+
+
+async def llm_sdk():
+    """The LLM SDK module, imported in a worker thread the first time so the loop keeps serving."""
+    global _llm_sdk
+    if _llm_sdk is None:
+        _llm_sdk = await asyncio.to_thread(importlib.import_module, LLM_MODULE)
+    return _llm_sdk
+
+
+async def preload_llm() -> float:
+    started = time.perf_counter()
+    await llm_sdk()
+    return time.perf_counter() - started
+
+
+def content_key(text: str) -> str:
+    normalized = " ".join(text.split()).casefold()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+async def ask_llm(text: str, session_id: str) -> Dict[str, Any]:
+    sdk = await llm_sdk()
+    chat = sdk.LlmChat(
+        api_key=os.environ["EMERGENT_LLM_KEY"],
+        session_id=session_id,
+        system_message=SYSTEM_MESSAGE
+    ).with_model("gemini", "gemini-3-flash-preview")
+
+    with track_outbound("gemini"):
+        response = await chat.send_message(sdk.UserMessage(text=f"Analyze this text for distress: {text}"))
+    return _shape(json.loads(response))
+
+
+async def ask_llm_batch(texts: List[str], session_id: str) -> List[Dict[str, Any]]:
+    sdk = await llm_sdk()
+    chat = sdk.LlmChat(
+        api_key=os.environ["EMERGENT_LLM_KEY"],
+        session_id=session_id,
+        system_message=BATCH_SYSTEM_MESSAGE
+    ).with_model("gemini", "gemini-3-flash-preview")
+
+    with track_outbound("gemini"):
+        response = await chat.send_message(sdk.UserMessage(text=f"Analyze these texts for distress: {json.dumps(texts)}"))
+    results = json.loads(response)
+    if not isinstance(results, list) or len(results) != len(texts):
+        raise ValueError(f"expected {len(texts)} results, got {response[:200]!r}")
+    return [_shape(result) for result in results]
+
+
+def _shape(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "distress_level": result.get("distress_level", 0),
+        "triggers": result.get("triggers", []),
+        "recommendation": result.get("recommendation", "Monitor situation"),
+        "confidence": 0.85,
+    }
+
+
+class DistressAnalyzer:
+    """LLM distress analysis with a content-hash result cache and singleflight coalescing.
+
+    Clearly urgent text and short small talk are answered by the local pre-screen. Identical texts
+    (after whitespace/case normalisation) are answered from the cache; concurrent
+    identical requests share one in-flight LLM call, whether it is a single call or
+    part of a batch pack. At most `concurrency` LLM calls run at once across all
+    requests. Failures are not cached.
+    Every result carries a `source`: prescreen, cache or llm.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 600.0, use_prescreen: bool = True, concurrency: int = 8):
+        self.use_prescreen = use_prescreen
+        self.prescreened = 0
+        self.results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._llm_slots = asyncio.Semaphore(concurrency)
+        self._packs: Set[asyncio.Task] = set()
+        self.llm_calls = 0
+        self.llm_errors = 0
+        self.llm_seconds = 0.0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def avg_llm_seconds(self) -> float:
+        return self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+
+    async def _call(self, key: str, text: str, user_id: str) -> Dict[str, Any]:
+        async with self._llm_slots:
+            started = time.perf_counter()
+            try:
+                result = await ask_llm(text, f"distress_{user_id}_{uuid.uuid4().hex[:8]}")
+            except Exception:
+                self.llm_errors += 1
+                raise
+            finally:
+                self.llm_calls += 1
+                self.llm_seconds += time.perf_counter() - started
+        self.results.set(key, result)
+        return result
+
+    def _done(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away.
+            task.exception()
+
+    def _track(self, key: str, future: asyncio.Future) -> asyncio.Future:
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._done(key, f))
+        return future
+
+    def _start_call(self, key: str, text: str, user_id: str) -> asyncio.Future:
+        return self._track(key, asyncio.ensure_future(self._call(key, text, user_id)))
+
+    async def analyze(self, text: str, user_id: str) -> Dict[str, Any]:
+        if self.use_prescreen:
+            local = prescreen(text)
+            if local is not None:
+                self.prescreened += 1
+                self.saved_seconds += self.avg_llm_seconds
+                return {**local, "source": "prescreen"}
+
+        key = content_key(text)
+        cached = self.results.get(key)
+        if cached is not None:
+            self.saved_seconds += self.avg_llm_seconds
+            return {**cached, "source": "cache"}
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._start_call(key, text, user_id)
+        # shield: a disconnecting caller must not cancel the call others are waiting on.
+        return {**await asyncio.shield(task), "source": "llm"}
+
+    async def _call_pack(self, keys: List[str], texts: List[str], user_id: str) -> List[Dict[str, Any]]:
+        async with self._llm_slots:
+            started = time.perf_counter()
+            try:
+                results = await ask_llm_batch(texts, f"distress_batch_{user_id}_{uuid.uuid4().hex[:8]}")
+            except Exception:
+                self.llm_errors += 1
+                raise
+            finally:
+                self.llm_calls += 1
+                self.llm_seconds += time.perf_counter() - started
+        for key, result in zip(keys, results):
+            self.results.set(key, result)
+        return results
+
+    def _start_pack(self, keys: List[str], texts: List[str], user_id: str) -> None:
+        """Send `texts` as one packed prompt, registering each key as in flight so single requests can join."""
+        loop = asyncio.get_running_loop()
+        futures = [self._track(key, loop.create_future()) for key in keys]
+
+        async def run() -> None:
+            try:
+                try:
+                    results = await self._call_pack(keys, texts, user_id)
+                except Exception:
+                    # A failed pack falls back to one call per text.
+                    results = await asyncio.gather(
+                        *(self._call(key, text, user_id) for key, text in zip(keys, texts)), return_exceptions=True
+                    )
+                for future, result in zip(futures, results):
+                    if isinstance(result, BaseException):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            finally:
+                # Never leave a waiter hanging, e.g. when the loop shuts down mid-call.
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(RuntimeError("distress pack abandoned"))
+
+        pack = asyncio.ensure_future(run())
+        self._packs.add(pack)
+        pack.add_done_callback(self._packs.discard)
+
+    async def analyze_many(
+        self, texts: List[str], user_id: str, pack_size: int = 8
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, result) in input order, each as soon as it and everything before it is ready.
+
+        Texts the pre-screen or cache can answer resolve immediately, and texts already in
+        flight join that call. The rest are de-duplicated and packed `pack_size` to a
+        prompt; a pack that fails falls back to one call per text. LLM work is shared, so
+        it runs to completion (and is cached) even if this caller goes away.
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        pending: Dict[str, List[int]] = {}
+
+        for i, text in enumerate(texts):
+            local = prescreen(text) if self.use_prescreen else None
+            if local is not None:
+                self.prescreened += 1
+                self.saved_seconds += self.avg_llm_seconds
+                futures[i].set_result({**local, "source": "prescreen"})
+                continue
+            key = content_key(text)
+            cached = self.results.get(key)
+            if cached is not None:
+                self.saved_seconds += self.avg_llm_seconds
+                futures[i].set_result({**cached, "source": "cache"})
+            else:
+                pending.setdefault(key, []).append(i)
+
+        keys = [key for key in pending if key not in self._inflight]
+        self.coalesced += len(pending) - len(keys)
+        for start in range(0, len(keys), pack_size):
+            pack = keys[start:start + pack_size]
+            if len(pack) > 1:
+                self._start_pack(pack, [texts[pending[key][0]] for key in pack], user_id)
+        # Taken now, before anything can finish and leave _inflight.
+        flights = {
+            key: self._inflight.get(key) or self._start_call(key, texts[indexes[0]], user_id)
+            for key, indexes in pending.items()
+        }
+
+        async def run_one(key: str) -> None:
+            try:
+                result = {**await asyncio.shield(flights[key]), "source": "llm"}
+            except Exception:
+                result = fallback_result()
+            for i in pending[key]:
+                if not futures[i].done():
+                    futures[i].set_result(result)
+
+        tasks = [asyncio.ensure_future(run_one(key)) for key in pending]
+
+        try:
+            for i, future in enumerate(futures):
+                yield i, await future
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.results.stats(),
+            "prescreened": self.prescreened,
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "llm_calls": self.llm_calls,
+            "llm_errors": self.llm_errors,
+            "avg_llm_latency_s": round(self.avg_llm_seconds, 4),
+            "saved_latency_s": round(self.saved_seconds, 3),
+        }
+
+
+def fallback_result() -> Dict[str, Any]:
+    return {
+        "distress_level": 0.5,
+        "triggers": ["analysis_error"],
+        "recommendation": "Unable to analyze, recommend manual review",
+        "confidence": 0.3,
+        "source": "fallback",
+    }
+
@@ -0,0 +1,47 @@
+from typing import Any, Dict, Iterable, List, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticUndefined
+
+
+# OPT_UTC_Z keeps datetimes byte-identical to pydantic's JSON output ("...Z").
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class TrustedRows:
+    """Serializer for documents this service wrote itself through `model`.
+
+    Skips the per-row pydantic validate-and-dump that `response_model` does; rows are
+    only trimmed to the model's fields and missing static defaults are filled in.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = list(model.model_fields)
+        self.defaults = {
+            name: field.default
+            for name, field in model.model_fields.items()
+            if field.default is not PydanticUndefined
+        }
+        self.projection = {"_id": 0, **{name: 1 for name in self.fields}}
+        self.adapter = TypeAdapter(List[model])
+
+    def dump(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self.defaults:
+            return list(rows)
+        return [{**self.defaults, **row} for row in rows]
+
+    def encode(self, rows: Iterable[Dict[str, Any]], validate: bool = False) -> bytes:
+        if validate:
+            return self.adapter.dump_json(self.adapter.validate_python(rows))
+        return orjson.dumps(self.dump(rows), option=ORJSON_OPTIONS)
+
+    def response(self, rows: Iterable[Dict[str, Any]], headers: Dict[str, str] = None) -> FastJSONResponse:
+        return FastJSONResponse(self.dump(rows), headers=headers)
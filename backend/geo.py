@@ -0,0 +1,187 @@
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geo_point(location: Dict[str, Any]) -> Dict[str, Any]:
+    # GeoJSON wants [longitude, latitude]; the API speaks {"latitude", "longitude"}.
+    return {"type": "Point", "coordinates": [float(location["longitude"]), float(location["latitude"])]}
+
+
+class GeoGridIndex:
+    """In-memory fixed-grid spatial index over (lat, lng) points.
+
+    Points are bucketed into cells of `cell_deg` degrees; a radius query only
+    visits the cells overlapping the query's bounding box and then filters by
+    haversine distance.
+    """
+
+    def __init__(self, cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float, Dict[str, Any]]]] = defaultdict(dict)
+        self._where: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def upsert(self, key: str, lat: float, lng: float, item: Dict[str, Any]) -> None:
+        self.remove(key)
+        cell = self._cell(lat, lng)
+        self._cells[cell][key] = (lat, lng, item)
+        self._where[key] = cell
+
+    def remove(self, key: str) -> None:
+        cell = self._where.pop(key, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def rebuild(self, items: Iterable[Tuple[str, float, float, Dict[str, Any]]]) -> None:
+        self._cells.clear()
+        self._where.clear()
+        for key, lat, lng, item in items:
+            self.upsert(key, lat, lng, item)
+
+    def _candidates(self, lat: float, lng: float, radius: float):
+        dlat = radius / METERS_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = min(radius / (METERS_PER_DEGREE_LAT * cos_lat), 180.0)
+        lat_lo, lng_lo = self._cell(lat - dlat, lng - dlng)
+        lat_hi, lng_hi = self._cell(lat + dlat, lng + dlng)
+        # A huge radius would touch more cells than we have points; scanning everything is cheaper then.
+        if (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1) > len(self._cells):
+            for bucket in self._cells.values():
+                yield from bucket.values()
+            return
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lng_lo, lng_hi + 1):
+                bucket = self._cells.get((i, j))
+                if bucket:
+                    yield from bucket.values()
+
+    def nearby(self, lat: float, lng: float, radius: float, limit: Optional[int] = None, skip: int = 0) -> List[Tuple[float, Dict[str, Any]]]:
+        hits = []
+        for p_lat, p_lng, item in self._candidates(lat, lng, radius):
+            distance = haversine_m(lat, lng, p_lat, p_lng)
+            if distance <= radius:
+                hits.append((distance, item))
+        hits.sort(key=lambda hit: hit[0])
+        end = None if limit is None else skip + limit
+        return hits[skip:end]
+
+
+# Web-mercator ("slippy map") tiles, the same z/x/y scheme Leaflet uses.
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def tile_for(lat: float, lng: float, zoom: int) -> Tuple[int, int]:
+    n = 2 ** zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> Dict[str, float]:
+    n = 2 ** zoom
+
+    def lat_at(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return {
+        "south": lat_at(y + 1),
+        "west": x / n * 360.0 - 180.0,
+        "north": lat_at(y),
+        "east": (x + 1) / n * 360.0 - 180.0,
+    }
+
+
+def tiles_covering(south: float, west: float, north: float, east: float, zoom: int) -> List[Tuple[int, int]]:
+    x_lo, y_lo = tile_for(north, west, zoom)
+    x_hi, y_hi = tile_for(south, east, zoom)
+    return [(x, y) for x in range(x_lo, x_hi + 1) for y in range(y_lo, y_hi + 1)]
+
+
+# Geohash cells: base32 strings whose length is the precision; a cell's children share its prefix.
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(lat, lng) size in degrees of a cell at `precision`; longitude gets the extra bit on odd totals."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    value = bits = 0
+    even = True
+    while len(chars) < precision:
+        interval, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        if coord >= mid:
+            value = value * 2 + 1
+            interval[0] = mid
+        else:
+            value *= 2
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            value = bits = 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Dict[str, float]:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if (value >> shift) & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return {"south": lat_range[0], "west": lng_range[0], "north": lat_range[1], "east": lng_range[1]}
+
+
+def _geohash_span(south: float, west: float, north: float, east: float, precision: int):
+    dlat, dlng = geohash_cell_size(precision)
+    rows, cols = round(180.0 / dlat), round(360.0 / dlng)
+    i_lo, i_hi = (min(max(int((lat + 90.0) // dlat), 0), rows - 1) for lat in (south, north))
+    j_lo, j_hi = (min(max(int((lng + 180.0) // dlng), 0), cols - 1) for lng in (west, east))
+    return dlat, dlng, range(i_lo, i_hi + 1), range(j_lo, j_hi + 1)
+
+
+def geohash_cover_count(south: float, west: float, north: float, east: float, precision: int) -> int:
+    _, _, rows, cols = _geohash_span(south, west, north, east, precision)
+    return len(rows) * len(cols)
+
+
+def geohashes_covering(south: float, west: float, north: float, east: float, precision: int) -> List[str]:
+    dlat, dlng, rows, cols = _geohash_span(south, west, north, east, precision)
+    return [
+        geohash_encode(-90.0 + (i + 0.5) * dlat, -180.0 + (j + 0.5) * dlng, precision)
+        for i in rows for j in cols
+    ]
@@ -0,0 +1,203 @@
+"""Geohash-bucketed rollup of community reports, and its batch rebuild job.
+
+Each report increments one bucket per precision in `report_heatmap`; a bucket's
+_id is its geohash, so the precision is its length. Buckets carry the report count,
+counts by type, severity sum and max, and the last report time.
+
+    python heatmap.py [--batch-size 1000] [--pause 0.05]
+
+rebuilds the rollup from `community_reports` into a staging collection and swaps
+it in with renameCollection, so readers never see a half-built heatmap.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from geo import geohash_bounds, geohash_cover_count, geohash_encode, geohashes_covering
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger("heatmap")
+
+COLLECTION = "report_heatmap"
+PRECISIONS = (4, 5, 6, 7)
+MAX_CELLS = 1024
+CLOCK_SKEW = 60
+
+
+def _type_key(report_type: str) -> str:
+    # Field names can't contain '.' or start with '$'.
+    return str(report_type).replace(".", "_").replace("$", "_") or "unknown"
+
+
+def _point(report: Dict[str, Any]) -> Optional[tuple]:
+    location = report.get("location") or {}
+    if "latitude" not in location or "longitude" not in location:
+        return None
+    return float(location["latitude"]), float(location["longitude"])
+
+
+def _empty() -> Dict[str, Any]:
+    return {"count": 0, "types": defaultdict(int), "severity_sum": 0, "severity_max": None, "last_seen": None}
+
+
+def _add(bucket: Dict[str, Any], report: Dict[str, Any]) -> None:
+    severity = report.get("severity") or 0
+    bucket["count"] += 1
+    bucket["types"][_type_key(report.get("type"))] += 1
+    bucket["severity_sum"] += severity
+    bucket["severity_max"] = severity if bucket["severity_max"] is None else max(bucket["severity_max"], severity)
+    timestamp = report.get("timestamp")
+    if timestamp and (bucket["last_seen"] is None or timestamp > bucket["last_seen"]):
+        bucket["last_seen"] = timestamp
+
+
+def _update(geohash: str, bucket: Dict[str, Any]) -> UpdateOne:
+    inc = {"count": bucket["count"], "severity_sum": bucket["severity_sum"]}
+    inc.update({f"types.{name}": n for name, n in bucket["types"].items()})
+    maxes = {"severity_max": bucket["severity_max"]}
+    if bucket["last_seen"] is not None:
+        maxes["last_seen"] = bucket["last_seen"]
+    return UpdateOne(
+        {"_id": geohash},
+        {"$inc": inc, "$max": maxes, "$setOnInsert": {"precision": len(geohash)}},
+        upsert=True,
+    )
+
+
+def bucket_updates(reports: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+    """One $inc upsert per touched bucket, with reports in the same bucket folded together."""
+    buckets: Dict[str, Dict[str, Any]] = defaultdict(_empty)
+    for report in reports:
+        point = _point(report)
+        if point is None:
+            continue
+        for precision in PRECISIONS:
+            _add(buckets[geohash_encode(*point, precision)], report)
+    return [_update(geohash, bucket) for geohash, bucket in buckets.items()]
+
+
+async def record_report(db, report: Dict[str, Any]) -> None:
+    updates = bucket_updates([report])
+    if updates:
+        await db[COLLECTION].bulk_write(updates, ordered=False)
+
+
+def pick_precision(south: float, west: float, north: float, east: float, precision: Optional[int] = None) -> Optional[int]:
+    """The finest precision (or the requested one) covering the bbox in at most MAX_CELLS buckets."""
+    candidates = [precision] if precision in PRECISIONS else sorted(PRECISIONS, reverse=True)
+    for candidate in candidates:
+        if geohash_cover_count(south, west, north, east, candidate) <= MAX_CELLS:
+            return candidate
+    return None
+
+
+async def query(db, south: float, west: float, north: float, east: float, precision: int) -> List[Dict[str, Any]]:
+    cells = geohashes_covering(south, west, north, east, precision)
+    docs = await db[COLLECTION].find({"_id": {"$in": cells}}).to_list(len(cells))
+    return [
+        {
+            "geohash": doc["_id"],
+            "bounds": geohash_bounds(doc["_id"]),
+            "count": doc["count"],
+            "types": doc.get("types", {}),
+            "severity_avg": round(doc["severity_sum"] / doc["count"], 2) if doc["count"] else 0,
+            "severity_max": doc.get("severity_max"),
+            "last_seen": doc.get("last_seen"),
+        }
+        for doc in docs
+    ]
+
+
+async def _fold(db, staging, after: Any, upto: Any, batch_size: int, pause: float) -> Tuple[int, Any]:
+    """Roll up reports with after < _id <= upto (either bound optional) into `staging`; returns (reports, last _id)."""
+    reports = 0
+    while True:
+        id_range = {}
+        if after is not None:
+            id_range["$gt"] = after
+        if upto is not None:
+            id_range["$lte"] = upto
+        batch = await db.community_reports.find(
+            {"_id": id_range} if id_range else {}, {"location": 1, "type": 1, "severity": 1, "timestamp": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return reports, after
+        updates = bucket_updates(batch)
+        if updates:
+            await staging.bulk_write(updates, ordered=False)
+        reports += len(batch)
+        after = batch[-1]["_id"]
+        logger.info(f"{reports} reports rolled up")
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def rebuild(db, batch_size: int = 1000, pause: float = 0.0) -> Dict[str, int]:
+    staging = db[f"{COLLECTION}_rebuild"]
+    await staging.drop()
+    # Reports inserted while we scan are recorded into the live rollup, which the swap
+    # replaces, so the scan stops at the starting point and everything after it is folded
+    # into staging just before the swap. ObjectIds carry the inserting client's clock, so
+    # the starting point is backed off by CLOCK_SKEW to catch workers running behind.
+    cutoff = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(seconds=CLOCK_SKEW))
+    reports, _ = await _fold(db, staging, None, cutoff, batch_size, pause)
+    late, folded = await _fold(db, staging, cutoff, None, batch_size, 0.0)
+
+    # A report inserted after that last read is recorded into the live rollup the swap
+    # drops, so note the newest report before swapping and fold the ones in between into
+    # the new rollup afterwards. Reports inserted after this read record into the new
+    # rollup themselves. The one remaining race is a report inserted before this read
+    # whose own record_report only lands after the rename: that report is counted twice.
+    newest = await db.community_reports.find({}, {"_id": 1}).sort("_id", -1).limit(1).to_list(1)
+    buckets = await staging.count_documents({})
+    if buckets:
+        await staging.rename(COLLECTION, dropTarget=True)
+    else:
+        await db[COLLECTION].drop()
+    if newest and (folded is None or newest[0]["_id"] > folded):
+        late += (await _fold(db, db[COLLECTION], folded, newest[0]["_id"], batch_size, 0.0))[0]
+        buckets = await db[COLLECTION].count_documents({})
+    if late:
+        logger.info(f"{late} reports arrived during the rebuild")
+    reports += late
+    await db.migrations.update_one(
+        {"_id": f"{COLLECTION}:rebuild"},
+        {"$set": {"reports": reports, "buckets": buckets, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return {"reports": reports, "buckets": buckets}
+
+
+async def run(args) -> Dict[str, int]:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        return await rebuild(client[os.environ['DB_NAME']], args.batch_size, args.pause)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the report heatmap rollup from community_reports.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    summary = asyncio.run(run(args))
+    print(f"{summary['reports']} reports -> {summary['buckets']} buckets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from cache import TTLCache
+
+MAX_KEY_LENGTH = 255
+
+
+class TriggerDeduper:
+    """Suppresses duplicate SOS triggers from retries and repeated taps.
+
+    Alerts are remembered per worker by (user_id, Idempotency-Key) for `key_ttl`.
+    Triggers for one user are serialized with `lock`, so concurrent taps on this
+    worker see the first one's alert. Everything else is the caller's job against
+    Mongo: keys seen by other workers (backed by a unique index) and the per-user
+    `window`, which is always checked against the stored status so that an alert
+    resolved elsewhere never swallows a new SOS.
+    """
+
+    def __init__(self, window: float = 30.0, key_ttl: float = 86400.0, maxsize: int = 10000):
+        self.window = window
+        self.keys = TTLCache(maxsize=maxsize, ttl=key_ttl)
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self.replayed = 0
+
+    @asynccontextmanager
+    async def lock(self, user_id: str) -> AsyncIterator[None]:
+        lock, users = self._locks.get(user_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[user_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[user_id]
+            if users == 1:
+                del self._locks[user_id]
+            else:
+                self._locks[user_id] = (lock, users - 1)
+
+    def lookup(self, user_id: str, key: Optional[str]) -> Any:
+        alert = self.keys.get((user_id, key)) if key else None
+        if alert is not None:
+            self.replayed += 1
+        return alert
+
+    def remember(self, user_id: str, key: Optional[str], alert: Any) -> None:
+        if key:
+            self.keys.set((user_id, key), alert)
+
+    def forget(self, user_id: str) -> None:
+        """Drop the user's keys once their alert is resolved, so replays read the stored status."""
+        self.keys.discard_where(lambda key, _: key[0] == user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window": self.window,
+            "replayed": self.replayed,
+            "keys": self.keys.stats(),
+            "locked_users": len(self._locks),
+        }
@@ -0,0 +1,328 @@
+"""Stream safety zones from CSV or GeoJSON into Mongo in validated, upserted chunks.
+
+Input is parsed incrementally and written with one unordered bulk_write per chunk,
+so memory stays flat whatever the file size. Rows are keyed on a natural key
+(type, name and rounded coordinates); re-importing a file updates zones in place.
+
+    python import_zones.py police_stations.csv [--chunk-size 1000] [--dry-run]
+    python import_zones.py hospitals.geojson --format geojson
+
+CSV columns: name, type, latitude (lat), longitude (lng/lon), address, contact, hours,
+verified, facilities (separated by ';' or '|'). GeoJSON: a FeatureCollection, or one
+Feature per line with --format geojsonl, of Point features carrying the same properties.
+
+Running API workers pick the change up through the `safety_zones` response cache
+version and a `zones` invalidation event, which rebuilds their ZONE_SPATIAL_INDEX=memory
+index and clears their risk scores.
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Union
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from geo import geo_point
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger("import_zones")
+
+FORMATS = ("csv", "geojson", "geojsonl")
+FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+MAX_FEATURE_CHARS = 1_000_000
+MAX_ERRORS = 100
+
+
+async def iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = ""
+    async for text in iter_text(chunks):
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+# A record the parser could not turn into a row; import_zones counts it as invalid.
+Record = Union[Dict[str, Any], ValueError]
+
+
+async def csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    header: Optional[List[str]] = None
+    record = ""
+    async for line in iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            # Quoted field spanning lines; keep reading until the quotes balance.
+            continue
+        if not record.strip():
+            record = ""
+            continue
+        row = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [column.strip().lower() for column in row]
+            continue
+        yield dict(zip(header, (value.strip() for value in row)))
+
+
+async def geojsonl_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            feature = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+            continue
+        yield feature_record(feature)
+
+
+async def geojson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Yield the features of a FeatureCollection one at a time without loading the whole document."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    in_features = False
+    async for text in iter_text(chunks):
+        buffer += text
+        if not in_features:
+            match = FEATURES_START.search(buffer)
+            if match is None:
+                continue
+            buffer = buffer[match.end():]
+            in_features = True
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                buffer = ""
+                break
+            if buffer[position] == "]":
+                return
+            try:
+                feature, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                buffer = buffer[position:]
+                if len(buffer) > MAX_FEATURE_CHARS:
+                    raise ValueError("GeoJSON feature too large or malformed")
+                break
+            yield feature_record(feature)
+    if not in_features:
+        raise ValueError("no \"features\" array found in GeoJSON input")
+    raise ValueError("GeoJSON input ended inside the features array")
+
+
+def feature_row(feature: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(feature.get("properties") or {})
+    geometry = feature.get("geometry") or {}
+    if geometry.get("type") == "Point":
+        row["longitude"], row["latitude"] = geometry["coordinates"][:2]
+    return row
+
+
+def feature_record(feature: Any) -> Record:
+    try:
+        return feature_row(feature)
+    except (KeyError, AttributeError, ValueError, TypeError, IndexError) as e:
+        return ValueError(f"malformed feature: {e!r}")
+
+
+def records_for(fmt: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    if fmt == "csv":
+        return csv_records(chunks)
+    if fmt == "geojsonl":
+        return geojsonl_records(chunks)
+    return geojson_records(chunks)
+
+
+def _first(row: Dict[str, Any], *names: str) -> Any:
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def zone_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a CSV row or GeoJSON properties onto SafetyZone fields; raises ValueError on bad input."""
+    latitude = float(_first(row, "latitude", "lat"))
+    longitude = float(_first(row, "longitude", "lng", "lon"))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("coordinates out of range")
+    facilities = row.get("facilities") or []
+    if isinstance(facilities, str):
+        facilities = [f.strip() for f in re.split(r"[;|]", facilities) if f.strip()]
+    verified = row.get("verified", True)
+    if isinstance(verified, str):
+        verified = verified.strip().lower() not in ("0", "false", "no", "n", "")
+    fields = {
+        "name": _first(row, "name"),
+        "type": _first(row, "type"),
+        "location": {"latitude": latitude, "longitude": longitude},
+        "address": _first(row, "address") or "",
+        "contact": _first(row, "contact", "phone"),
+        "verified": verified,
+        "facilities": facilities,
+    }
+    hours = _first(row, "hours")
+    if hours:
+        fields["hours"] = hours
+    return fields
+
+
+def natural_key(zone: Dict[str, Any]) -> str:
+    name = " ".join(zone["name"].split()).casefold()
+    location = zone["location"]
+    return f"{zone['type']}|{name}|{location['latitude']:.5f},{location['longitude']:.5f}"
+
+
+def upsert_op(zone: Dict[str, Any]) -> UpdateOne:
+    zone_id = zone.pop("zone_id", None) or f"zone_{uuid.uuid4().hex[:12]}"
+    key = natural_key(zone)
+    return UpdateOne(
+        {"natural_key": key},
+        {"$set": {**zone, "natural_key": key, "geo": geo_point(zone["location"])},
+         "$setOnInsert": {"zone_id": zone_id}},
+        upsert=True,
+    )
+
+
+async def import_zones(db, records: AsyncIterator[Record], model, chunk_size: int = 1000,
+                       dry_run: bool = False, on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Validate `records` against `model` (SafetyZone) and upsert them chunk by chunk."""
+    summary = {"rows": 0, "invalid": 0, "inserted": 0, "updated": 0, "failed": 0, "chunks": 0, "errors": []}
+
+    def reject(row: int, error: str) -> None:
+        if len(summary["errors"]) < MAX_ERRORS:
+            summary["errors"].append({"row": row, "error": error[:300]})
+
+    async def flush(ops: List[UpdateOne], rows: Iterable[int]) -> None:
+        rows = list(rows)
+        inserted = updated = failed = 0
+        if dry_run:
+            inserted = len(ops)
+        else:
+            try:
+                result = await db.safety_zones.bulk_write(ops, ordered=False)
+                inserted, updated = result.upserted_count, result.matched_count
+            except BulkWriteError as e:
+                details = e.details
+                inserted, updated = details.get("nUpserted", 0), details.get("nMatched", 0)
+                failed = len(details.get("writeErrors", []))
+                for error in details.get("writeErrors", []):
+                    reject(rows[error["index"]], error.get("errmsg", "write failed"))
+        summary["chunks"] += 1
+        summary["inserted"] += inserted
+        summary["updated"] += updated
+        summary["failed"] += failed
+        if on_chunk:
+            on_chunk({"chunk": summary["chunks"], "rows": summary["rows"], "inserted": inserted,
+                      "updated": updated, "failed": failed, "invalid": summary["invalid"]})
+
+    ops: List[UpdateOne] = []
+    op_rows: List[int] = []
+    async for record in records:
+        summary["rows"] += 1
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            zone = model(**zone_fields(record)).model_dump()
+        except (ValueError, TypeError) as e:
+            summary["invalid"] += 1
+            reject(summary["rows"], str(e))
+            continue
+        ops.append(upsert_op(zone))
+        op_rows.append(summary["rows"])
+        if len(ops) >= chunk_size:
+            await flush(ops, op_rows)
+            ops, op_rows = [], []
+    if ops:
+        await flush(ops, op_rows)
+    return summary
+
+
+async def read_file(path: str, block_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            block = await asyncio.to_thread(f.read, block_size)
+            if not block:
+                return
+            yield block
+
+
+def guess_format(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix in (".geojsonl", ".geojsons", ".ndjson", ".jsonl"):
+        return "geojsonl"
+    if suffix in (".geojson", ".json"):
+        return "geojson"
+    return "csv"
+
+
+async def run(args) -> Dict[str, Any]:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from invalidation import InvalidationFeed
+    from response_cache import ResponseCache
+    from models import SafetyZone
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        db = client[os.environ['DB_NAME']]
+        summary = await import_zones(
+            db, records_for(args.format or guess_format(args.path), read_file(args.path)), SafetyZone,
+            chunk_size=args.chunk_size, dry_run=args.dry_run,
+            on_chunk=lambda report: logger.info(
+                f"chunk {report['chunk']}: {report['rows']} rows read, {report['inserted']} inserted, "
+                f"{report['updated']} updated, {report['failed']} failed, {report['invalid']} invalid so far"),
+        )
+        if not args.dry_run and (summary["inserted"] or summary["updated"]):
+            await ResponseCache(db).bump("safety_zones")
+            await InvalidationFeed(db).publish("zones")
+        return summary
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="default: guessed from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    summary = asyncio.run(run(args))
+    print(f"{summary['rows']} rows: {summary['inserted']} inserted, {summary['updated']} updated, "
+          f"{summary['failed']} failed, {summary['invalid']} invalid")
+    for error in summary["errors"]:
+        print(f"  row {error['row']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
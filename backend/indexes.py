@@ -0,0 +1,141 @@
+import logging
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Options that change index semantics; anything else (v, ns, background...) is ignored when diffing.
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+# Declared indexes per collection. Names are explicit so drift can be tracked across deploys.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # Mongo's TTL monitor removes sessions once expires_at has passed.
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "emergency_contacts": [
+        IndexModel([("contact_id", ASCENDING)], name="contact_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING)], name="user_id_created_at"),
+    ],
+    "emergency_alerts": [
+        IndexModel([("alert_id", ASCENDING)], name="alert_id_unique", unique=True),
+        IndexModel(
+            [("user_id", ASCENDING), ("status", ASCENDING), ("triggered_at", DESCENDING)],
+            name="user_id_status_triggered_at",
+        ),
+        # Only alerts triggered with an Idempotency-Key carry the field; a retry can't insert a second one.
+        IndexModel(
+            [("user_id", ASCENDING), ("idempotency_key", ASCENDING)],
+            name="user_id_idempotency_key_unique",
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$exists": True}},
+        ),
+    ],
+    "community_reports": [
+        IndexModel([("report_id", ASCENDING)], name="report_id_unique", unique=True),
+        IndexModel([("timestamp", DESCENDING), ("report_id", DESCENDING)], name="timestamp_report_id_desc"),
+        IndexModel([("location.latitude", ASCENDING), ("location.longitude", ASCENDING)], name="location_lat_lng"),
+    ],
+    "safety_zones": [
+        IndexModel([("zone_id", ASCENDING)], name="zone_id_unique", unique=True),
+        IndexModel([("name", ASCENDING)], name="name"),
+        IndexModel([("verified", ASCENDING)], name="verified"),
+        IndexModel([("geo", GEOSPHERE)], name="geo_2dsphere"),
+        # Set by bulk imports; zones seeded or created before that have none.
+        IndexModel([("natural_key", ASCENDING)], name="natural_key_unique", unique=True, sparse=True),
+    ],
+    "notification_jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        IndexModel(
+            [("status", ASCENDING), ("priority", ASCENDING), ("next_attempt_at", ASCENDING)],
+            name="status_priority_next_attempt_at",
+        ),
+        IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)], name="status_locked_until"),
+        IndexModel([("claim_id", ASCENDING)], name="claim_id", sparse=True),
+        IndexModel([("alert_id", ASCENDING)], name="alert_id"),
+        # Finished jobs are only kept for auditing: sent_at/failed_at are set only on sent/failed jobs.
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl", expireAfterSeconds=30 * 24 * 3600),
+        IndexModel([("failed_at", ASCENDING)], name="failed_at_ttl", expireAfterSeconds=90 * 24 * 3600),
+    ],
+    "alert_locations": [
+        IndexModel([("meta.alert_id", ASCENDING), ("ts", ASCENDING)], name="alert_id_ts"),
+    ],
+    "cache_invalidations": [
+        # Workers only read the last few seconds; an hour leaves room for a slow poller.
+        IndexModel([("ts", ASCENDING)], name="ts_ttl", expireAfterSeconds=3600),
+    ],
+}
+
+# Time-series collections have to be created explicitly, before their first insert.
+TIMESERIES = {
+    "alert_locations": {
+        "timeseries": {"timeField": "ts", "metaField": "meta", "granularity": "seconds"},
+        "expireAfterSeconds": 90 * 24 * 3600,
+    },
+}
+
+
+def _spec(document: Dict[str, Any]) -> Dict[str, Any]:
+    key = document["key"]
+    spec = {"key": [(field, direction) for field, direction in (key.items() if hasattr(key, "items") else key)]}
+    for option in COMPARED_OPTIONS:
+        if option in document:
+            spec[option] = document[option]
+    return spec
+
+
+async def index_drift(db) -> Dict[str, Dict[str, Any]]:
+    """Compare declared indexes with what the server has, per collection."""
+    report = {}
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        existing.pop("_id_", None)
+        declared = {model.document["name"]: _spec(model.document) for model in models}
+        actual = {name: _spec(info) for name, info in existing.items()}
+        report[collection] = {
+            "missing": sorted(name for name in declared if name not in actual),
+            "unexpected": sorted(name for name in actual if name not in declared),
+            "mismatched": sorted(name for name in declared if name in actual and declared[name] != actual[name]),
+        }
+    return report
+
+
+async def ensure_timeseries(db) -> Dict[str, str]:
+    failed = {}
+    existing = set(await db.list_collection_names())
+    for collection, options in TIMESERIES.items():
+        if collection in existing:
+            continue
+        try:
+            await db.create_collection(collection, **options)
+        except PyMongoError as e:
+            logger.error(f"Creating time-series collection {collection} failed: {e}")
+            failed[collection] = str(e)
+    return failed
+
+
+async def ensure_indexes(db) -> Dict[str, Any]:
+    """Create every declared index. Safe to call on each startup; never drops anything."""
+    created = {}
+    failed = await ensure_timeseries(db)
+    for collection, models in INDEXES.items():
+        try:
+            created[collection] = await db[collection].create_indexes(models)
+        except PyMongoError as e:
+            # Usually an options conflict with a hand-made index or duplicate keys in old data.
+            logger.error(f"Index creation failed for {collection}: {e}")
+            failed[collection] = str(e)
+
+    drift = await index_drift(db)
+    for collection, entry in drift.items():
+        if any(entry.values()):
+            logger.warning(f"Index drift on {collection}: {entry}")
+    return {"created": created, "failed": failed, "drift": drift}
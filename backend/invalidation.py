@@ -0,0 +1,93 @@
+import asyncio
+import inspect
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationFeed:
+    """Cross-process invalidation of in-memory state through Mongo.
+
+    `publish(kind, **data)` records an event in `cache_invalidations` (expired by a TTL
+    index). Each API worker polls the collection every `sync_interval` seconds and runs
+    the handlers registered with `on(kind, handler)` for events published by other
+    processes; the publisher applies its own change directly. Events are re-read over
+    `overlap` seconds to tolerate clock skew and late inserts, and applied once per _id.
+    """
+
+    def __init__(self, db, sync_interval: float = 1.0, overlap: float = 5.0):
+        self.db = db
+        self.sync_interval = sync_interval
+        self.overlap = timedelta(seconds=overlap)
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Callable[..., Any]]] = defaultdict(list)
+        self._seen = TTLCache(maxsize=100000, ttl=overlap * 4)
+        self._cursor: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.applied = 0
+        self.failed = 0
+
+    def on(self, kind: str, handler: Callable[..., Any]) -> None:
+        self._handlers[kind].append(handler)
+
+    async def publish(self, kind: str, **data: Any) -> None:
+        await self.db.cache_invalidations.insert_one(
+            {"kind": kind, "data": data, "origin": self.origin, "ts": datetime.now(timezone.utc)}
+        )
+        self.published += 1
+
+    async def poll(self) -> int:
+        now = datetime.now(timezone.utc)
+        since = (self._cursor or now) - self.overlap
+        events = await self.db.cache_invalidations.find(
+            {"ts": {"$gt": since}, "origin": {"$ne": self.origin}}
+        ).sort("ts", 1).to_list(None)
+        self._cursor = now
+        applied = 0
+        for event in events:
+            if event["_id"] in self._seen:
+                continue
+            self._seen.set(event["_id"], True)
+            for handler in self._handlers.get(event["kind"], ()):
+                try:
+                    result = handler(**event.get("data", {}))
+                    if inspect.isawaitable(result):
+                        await result
+                    applied += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Invalidation handler for {event['kind']} failed: {e}")
+        self.applied += applied
+        return applied
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"Invalidation poll failed: {e}")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "applied": self.applied,
+            "failed": self.failed,
+            "sync_interval": self.sync_interval,
+        }
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RESOLVED = {"event": "resolved"}
+
+
+def parse_ping(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a client location ping; raises ValueError on bad input."""
+    latitude = float(data["latitude"])
+    longitude = float(data["longitude"])
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("coordinates out of range")
+    ping = {"latitude": latitude, "longitude": longitude}
+    for field in ("accuracy", "heading", "speed"):
+        if data.get(field) is not None:
+            ping[field] = float(data[field])
+    ping["ts"] = datetime.now(timezone.utc)
+    return ping
+
+
+class LocationHub:
+    """In-memory fan-out of location pings to the subscribers of each alert.
+
+    Each subscriber gets a bounded queue; a slow subscriber loses its oldest pings
+    rather than holding up the publisher. The last ping per alert is kept for
+    `last_ttl` seconds, so alerts that are never resolved don't pile up.
+    """
+
+    def __init__(self, queue_size: int = 100, last_ttl: float = 600.0, max_alerts: int = 10000):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.last = TTLCache(maxsize=max_alerts, ttl=last_ttl)
+
+    def subscriber_count(self, alert_id: str) -> int:
+        return len(self._subscribers.get(alert_id, ()))
+
+    @contextmanager
+    def subscribe(self, alert_id: str):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        last = self.last.get(alert_id)
+        if last is not None:
+            queue.put_nowait(last)
+        self._subscribers[alert_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(alert_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[alert_id]
+
+    def _offer(self, queue: asyncio.Queue, item: Dict[str, Any]) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    def publish(self, alert_id: str, ping: Dict[str, Any]) -> None:
+        self.last.set(alert_id, ping)
+        for queue in self._subscribers.get(alert_id, ()):
+            self._offer(queue, ping)
+
+    def close(self, alert_id: str) -> None:
+        self.last.pop(alert_id, None)
+        for queue in self._subscribers.get(alert_id, ()):
+            self._offer(queue, RESOLVED)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "alerts": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "last_pings": len(self.last),
+        }
+
+
+class LocationWriter:
+    """Write-behind buffer persisting pings to the alert_locations time-series collection.
+
+    Pings closer than `min_interval` seconds to the previous buffered ping of the same
+    alert replace it instead of adding a row. Every `flush_interval` seconds the buffer
+    goes out as one unordered bulk_write, plus one last_location update per alert.
+    Pings and last_location updates that fail to write are put back for the next flush,
+    keeping at most `max_buffer` pings (the oldest are dropped first).
+    """
+
+    def __init__(self, db, flush_interval: float = 2.0, min_interval: float = 1.0, max_buffer: int = 50000):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.min_interval = min_interval
+        self.max_buffer = max_buffer
+        self._buffer: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._buffered = 0
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._overflow_task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.coalesced = 0
+        self.written = 0
+        self.flushes = 0
+        self.requeued = 0
+        self.dropped = 0
+
+    def add(self, alert_id: str, user_id: str, ping: Dict[str, Any]) -> None:
+        self.received += 1
+        pings = self._buffer[alert_id]
+        doc = {"ts": ping["ts"], "meta": {"alert_id": alert_id, "user_id": user_id},
+               **{k: v for k, v in ping.items() if k != "ts"}}
+        if pings and (ping["ts"] - pings[-1]["ts"]).total_seconds() < self.min_interval:
+            pings[-1] = doc
+            self.coalesced += 1
+            return
+        pings.append(doc)
+        self._buffered += 1
+        if self._buffered >= self.max_buffer and (self._overflow_task is None or self._overflow_task.done()):
+            self._overflow_task = asyncio.ensure_future(self.flush())
+
+    def _requeue(self, docs: List[Dict[str, Any]]) -> None:
+        """Put pings that failed to write back in front of the newer ones, within max_buffer."""
+        docs = sorted(docs, key=lambda doc: doc["ts"])
+        overflow = min(len(docs), self._buffered + len(docs) - self.max_buffer)
+        if overflow > 0:
+            docs = docs[overflow:]
+            self.dropped += overflow
+            logger.error(f"Location buffer full, dropped the {overflow} oldest unwritten pings")
+        failed: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for doc in docs:
+            failed[doc["meta"]["alert_id"]].append(doc)
+        for alert_id, pings in failed.items():
+            self._buffer[alert_id] = pings + self._buffer[alert_id]
+        self._buffered += len(docs)
+        self.requeued += len(docs)
+
+    async def flush(self) -> int:
+        if not self._buffer and not self._latest:
+            return 0
+        buffer, self._buffer, self._buffered = self._buffer, defaultdict(list), 0
+        latest, self._latest = self._latest, {}
+        latest.update({
+            alert_id: {k: v for k, v in pings[-1].items() if k != "meta"}
+            for alert_id, pings in buffer.items() if pings
+        })
+        docs = [doc for pings in buffer.values() for doc in pings]
+        written = len(docs)
+        if docs:
+            try:
+                await self.db.alert_locations.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+            except BulkWriteError as e:
+                # Unordered: everything but the reported rows went in.
+                failed = [docs[error["index"]] for error in e.details.get("writeErrors", [])]
+                written -= len(failed)
+                self._requeue(failed)
+                logger.error(f"Location flush: {len(failed)} of {len(docs)} pings failed, retrying next flush: {e}")
+            except Exception as e:
+                written = 0
+                self._requeue(docs)
+                logger.error(f"Location flush of {len(docs)} pings failed, retrying next flush: {e}")
+        if latest:
+            try:
+                await self.db.emergency_alerts.bulk_write([
+                    UpdateOne({"alert_id": alert_id, "status": "active"}, {"$set": {"last_location": ping}})
+                    for alert_id, ping in latest.items()
+                ], ordered=False)
+            except Exception as e:
+                for alert_id, ping in latest.items():
+                    self._latest.setdefault(alert_id, ping)
+                logger.error(f"Location flush of {len(latest)} last_location updates failed, retrying next flush: {e}")
+        self.written += written
+        self.flushes += 1
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._overflow_task is not None:
+            await asyncio.gather(self._overflow_task, return_exceptions=True)
+            self._overflow_task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": self._buffered,
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "flushes": self.flushes,
+            "requeued": self.requeued,
+            "dropped": self.dropped,
+        }
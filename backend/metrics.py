@@ -0,0 +1,139 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from pymongo import monitoring
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status code", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response body is fully sent", ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+# With several workers (serve.py sets PROMETHEUS_MULTIPROC_DIR) gauges are summed over live processes.
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled", ["method"], multiprocess_mode="livesum")
+HTTP_EXCEPTIONS = Counter(
+    "http_request_exceptions_total", "Requests that raised out of the app", ["method", "route", "exception"]
+)
+
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "Mongo command round-trip time", ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MONGO_IN_FLIGHT = Gauge("mongo_commands_in_flight", "Mongo commands awaiting a reply", multiprocess_mode="livesum")
+MONGO_ERRORS = Counter("mongo_command_errors_total", "Failed Mongo commands", ["collection", "command"])
+
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds", "Calls to external services", ["service"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+OUTBOUND_IN_FLIGHT = Gauge("outbound_requests_in_flight", "Calls to external services in progress", ["service"],
+                           multiprocess_mode="livesum")
+OUTBOUND_ERRORS = Counter("outbound_request_errors_total", "Failed calls to external services", ["service"])
+
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests in progress", ["priority"], multiprocess_mode="livesum")
+ADMISSION_QUEUED = Gauge("admission_queue_depth", "Requests waiting for admission", ["priority"], multiprocess_mode="livesum")
+ADMISSION_SHED = Counter("admission_shed_total", "Requests rejected with 503 under load", ["priority"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, streaming bodies included.
+
+    Requests are labelled with the matched route template (e.g. /api/emergency/resolve/{alert_id})
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        # The route is only known after routing, so in-flight is tracked per method.
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            HTTP_EXCEPTIONS.labels(method, route_label(scope), type(e).__name__).inc()
+            raise
+        finally:
+            in_flight.dec()
+            route = route_label(scope)
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, status).inc()
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Command monitoring hook for the Motor client; runs on pymongo's worker threads."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], str] = {}
+
+    def started(self, event):
+        name = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            name = event.command.get("collection")
+        self._pending[(event.connection_id, event.request_id)] = name if isinstance(name, str) else ""
+        MONGO_IN_FLIGHT.inc()
+
+    def _finish(self, event) -> str:
+        MONGO_IN_FLIGHT.dec()
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        return collection
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        MONGO_ERRORS.labels(self._finish(event), event.command_name).inc()
+
+
+@contextmanager
+def track_outbound(service: str):
+    """Time a call to an external service (OAuth, Gemini); exceptions count as errors."""
+    in_flight = OUTBOUND_IN_FLIGHT.labels(service)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OUTBOUND_ERRORS.labels(service).inc()
+        raise
+    finally:
+        in_flight.dec()
+        OUTBOUND_LATENCY.labels(service).observe(time.perf_counter() - start)
+
+
+def render() -> Tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def release_worker_metrics() -> None:
+    """Drop this process's live gauges from the shared multiprocess directory on shutdown."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
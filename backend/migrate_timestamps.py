@@ -0,0 +1,129 @@
+"""Convert ISO-8601 string timestamps to native BSON dates, online and in batches.
+
+Each (collection, field) pair keeps a checkpoint in the `migrations` collection,
+so an interrupted run picks up where it stopped. Every update is conditional on
+the original string value, which makes it safe to run next to the live API.
+
+    python migrate_timestamps.py [--batch-size 500] [--pause 0.05] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger("migrate_timestamps")
+
+TIMESTAMP_FIELDS = {
+    "users": ["created_at", "last_active"],
+    "user_sessions": ["created_at", "expires_at"],
+    "emergency_contacts": ["created_at"],
+    "emergency_alerts": ["triggered_at", "resolved_at"],
+    "community_reports": ["timestamp"],
+}
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def migrate_field(db, collection: str, field: str, batch_size: int, pause: float, dry_run: bool) -> dict:
+    checkpoint_id = f"timestamps:{collection}.{field}"
+    checkpoint = await db.migrations.find_one({"_id": checkpoint_id}) or {}
+    last_id = checkpoint.get("last_id")
+    converted = checkpoint.get("converted", 0)
+    skipped = checkpoint.get("skipped", 0)
+
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query, {field: 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            parsed = parse_timestamp(doc[field])
+            if parsed is None:
+                skipped += 1
+                logger.warning(f"{collection}.{field}: unparseable value {doc[field]!r} on {doc['_id']}")
+                continue
+            ops.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: parsed}}))
+
+        if ops and not dry_run:
+            result = await db[collection].bulk_write(ops, ordered=False)
+            converted += result.modified_count
+        elif dry_run:
+            converted += len(ops)
+
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            await db.migrations.update_one(
+                {"_id": checkpoint_id},
+                {"$set": {"last_id": last_id, "converted": converted, "skipped": skipped,
+                          "updated_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+        logger.info(f"{collection}.{field}: {converted} converted, {skipped} skipped")
+        if pause:
+            await asyncio.sleep(pause)
+
+    if not dry_run:
+        await db.migrations.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"done": True, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+    return {"converted": converted, "skipped": skipped}
+
+
+async def migrate(db, batch_size: int = 500, pause: float = 0.0, dry_run: bool = False, reset: bool = False) -> dict:
+    if reset:
+        await db.migrations.delete_many({"_id": {"$regex": "^timestamps:"}})
+    summary = {}
+    for collection, fields in TIMESTAMP_FIELDS.items():
+        for field in fields:
+            summary[f"{collection}.{field}"] = await migrate_field(db, collection, field, batch_size, pause, dry_run)
+    return summary
+
+
+async def run(args) -> dict:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        return await migrate(client[os.environ['DB_NAME']], args.batch_size, args.pause, args.dry_run, args.reset)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--reset", action="store_true", help="ignore saved checkpoints and rescan from the start")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    summary = asyncio.run(run(args))
+    for key, counts in summary.items():
+        print(f"{key}: {counts['converted']} converted, {counts['skipped']} skipped")
+
+
+if __name__ == "__main__":
+    main()
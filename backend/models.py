@@ -0,0 +1,129 @@
+"""Pydantic models for the API's documents and request bodies.
+
+Kept out of server.py so tools such as the import_zones CLI can validate data without
+building the app (Mongo client, background workers, metrics registry).
+"""
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+class User(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    user_id: str
+    email: EmailStr
+    name: str
+    picture: Optional[str] = None
+    phone: Optional[str] = None
+    created_at: datetime
+    emergency_settings: Optional[Dict[str, Any]] = None
+
+
+class EmergencyContact(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    contact_id: str = Field(default_factory=lambda: f"contact_{uuid.uuid4().hex[:12]}")
+    user_id: str
+    name: str
+    relationship: str
+    phone: str
+    email: Optional[EmailStr] = None
+    is_primary: bool = False
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class EmergencyAlert(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    alert_id: str = Field(default_factory=lambda: f"alert_{uuid.uuid4().hex[:12]}")
+    user_id: str
+    type: str
+    status: str
+    location: Dict[str, Any]
+    triggered_at: datetime
+    resolved_at: Optional[datetime] = None
+    contacts_notified: List[str] = Field(default_factory=list)
+    evidence: Optional[List[str]] = None
+
+
+class CommunityReport(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    report_id: str = Field(default_factory=lambda: f"report_{uuid.uuid4().hex[:12]}")
+    user_id: Optional[str] = None
+    type: str
+    severity: int
+    location: Dict[str, Any]
+    description: str
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    anonymous: bool = True
+    status: str = "pending"
+
+
+class SafetyZone(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    zone_id: str = Field(default_factory=lambda: f"zone_{uuid.uuid4().hex[:12]}")
+    name: str
+    type: str
+    location: Dict[str, float]
+    address: str
+    contact: Optional[str] = None
+    hours: str = "24/7"
+    verified: bool = True
+    facilities: List[str] = Field(default_factory=list)
+
+
+class CreateContactRequest(BaseModel):
+    name: str
+    relationship: str
+    phone: str
+    email: Optional[EmailStr] = None
+    is_primary: bool = False
+
+
+class TriggerEmergencyRequest(BaseModel):
+    type: str = "manual"
+    location: Dict[str, Any]
+    evidence: Optional[List[str]] = None
+
+
+class SubmitReportRequest(BaseModel):
+    type: str
+    severity: int
+    location: Dict[str, Any]
+    description: str
+    anonymous: bool = True
+
+
+class FakeCallRequest(BaseModel):
+    caller_name: str = "Mom"
+
+
+class AnalyzeDistressRequest(BaseModel):
+    text: str
+    location: Optional[Dict[str, Any]] = None
+
+
+DISTRESS_BATCH_MAX = int(os.environ.get('DISTRESS_BATCH_MAX', '100'))
+
+
+class AnalyzeDistressBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=DISTRESS_BATCH_MAX)
+    location: Optional[Dict[str, Any]] = None
+
+
+class RiskPoint(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
+RISK_BATCH_MAX = int(os.environ.get('RISK_BATCH_MAX', '500'))
+
+
+class RiskScoreRequest(BaseModel):
+    points: List[RiskPoint] = Field(..., min_length=1, max_length=RISK_BATCH_MAX)
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import random
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Lower value is claimed first.
+PRIORITY_SOS = 0
+PRIORITY_DEFAULT = 10
+
+
+def redact(recipient: str) -> str:
+    """Mask a phone number or email address for logs, keeping just enough to tell recipients apart."""
+    if "@" in recipient:
+        local, _, domain = recipient.partition("@")
+        return f"{local[:1]}***@{domain}"
+    return f"***{recipient[-2:]}" if len(recipient) > 4 else "***"
+
+
+class Transport(ABC):
+    """Delivers a batch of jobs for one channel; returns one error string (or None) per job."""
+
+    channel = "log"
+
+    @abstractmethod
+    async def send_batch(self, jobs: List[Dict[str, Any]]) -> List[Optional[str]]:
+        ...
+
+
+class LogTransport(Transport):
+    """Logs each delivery instead of sending it. Recipients are redacted and the message (which
+    carries the user's location) is left out; use FileTransport to inspect full payloads."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+
+    async def send_batch(self, jobs):
+        for job in jobs:
+            logger.info(f"[{self.channel}] {job['job_id']} for alert {job['alert_id']} -> {redact(job['recipient'])}")
+        return [None] * len(jobs)
+
+
+class FileTransport(Transport):
+    """Appends every delivery as a JSON line to `path`; a local stand-in for SMS/email gateways."""
+
+    def __init__(self, channel: str, path: str):
+        self.channel = channel
+        self.path = Path(path)
+
+    async def send_batch(self, jobs):
+        lines = "".join(
+            json.dumps({"channel": self.channel, "job_id": job["job_id"], "recipient": job["recipient"],
+                        "payload": job["payload"], "sent_at": datetime.now(timezone.utc).isoformat()}) + "\n"
+            for job in jobs
+        )
+        await asyncio.to_thread(self._append, lines)
+        return [None] * len(jobs)
+
+    def _append(self, lines: str) -> None:
+        with self.path.open("a") as f:
+            f.write(lines)
+
+
+class LoopbackTransport(Transport):
+    """Keeps deliveries in memory; `fail_next` makes the next N jobs fail, for exercising retries."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.sent: List[Dict[str, Any]] = []
+        self.fail_next = 0
+
+    async def send_batch(self, jobs):
+        errors = []
+        for job in jobs:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                errors.append("loopback: simulated failure")
+            else:
+                self.sent.append(job)
+                errors.append(None)
+        return errors
+
+
+def alert_jobs(alert: Dict[str, Any], user: Dict[str, Any], contacts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    location = alert.get("location") or {}
+    where = ""
+    if "latitude" in location and "longitude" in location:
+        where = f" Location: https://maps.google.com/?q={location['latitude']},{location['longitude']}"
+    message = f"SOS from {user['name']}: {alert['type']} emergency alert triggered.{where}"
+    priority = PRIORITY_SOS if alert.get("status") == "active" else PRIORITY_DEFAULT
+    now = datetime.now(timezone.utc)
+
+    jobs = []
+    for contact in contacts:
+        recipients = [("sms", contact.get("phone")), ("email", contact.get("email"))]
+        for channel, recipient in recipients:
+            if not recipient:
+                continue
+            jobs.append({
+                "job_id": f"job_{uuid.uuid4().hex[:12]}",
+                "alert_id": alert["alert_id"],
+                "user_id": alert["user_id"],
+                "contact_id": contact["contact_id"],
+                "channel": channel,
+                "recipient": recipient,
+                "payload": {"message": message, "alert_id": alert["alert_id"], "location": location,
+                            "share_token": alert.get("share_token")},
+                "priority": priority,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "locked_until": None,
+                "created_at": now,
+                "last_error": None,
+            })
+    return jobs
+
+
+class NotificationDispatcher:
+    """Durable Mongo-backed job queue drained by a pool of background workers.
+
+    Workers claim due jobs in (priority, next_attempt_at) order, so SOS jobs always
+    go out first, group each claimed batch by channel for the transports, and
+    reschedule failures with exponential backoff until `max_attempts`. Jobs whose
+    lease expires (worker crashed mid-send) are put back in the queue.
+    """
+
+    def __init__(self, db, transports: Dict[str, Transport], workers: int = 2, batch_size: int = 50,
+                 max_attempts: int = 5, backoff_base: float = 2.0, backoff_max: float = 300.0,
+                 lease_seconds: float = 60.0, poll_interval: float = 1.0):
+        self.db = db
+        self.transports = transports
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self.counters = defaultdict(int)
+
+    @property
+    def jobs(self):
+        return self.db.notification_jobs
+
+    async def enqueue(self, jobs: List[Dict[str, Any]]) -> int:
+        if not jobs:
+            return 0
+        await self.jobs.insert_many([dict(job) for job in jobs], ordered=False)
+        self.counters["enqueued"] += len(jobs)
+        self._wake.set()
+        return len(jobs)
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker: int) -> None:
+        while True:
+            try:
+                await self.requeue_expired()
+                processed = await self.process_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification worker {worker} error: {e}")
+                processed = 0
+            if not processed:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def requeue_expired(self) -> int:
+        result = await self.jobs.update_many(
+            {"status": "running", "locked_until": {"$lt": datetime.now(timezone.utc)}},
+            {"$set": {"status": "pending", "locked_until": None}}
+        )
+        return result.modified_count
+
+    async def claim(self) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        due = {"status": "pending", "next_attempt_at": {"$lte": now}}
+        candidates = await self.jobs.find(due, {"_id": 1}).sort(
+            [("priority", 1), ("next_attempt_at", 1)]
+        ).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+        # The status filter makes the claim atomic per job when several workers race for the same ids.
+        claim_id = uuid.uuid4().hex
+        await self.jobs.update_many(
+            {"_id": {"$in": [c["_id"] for c in candidates]}, "status": "pending"},
+            {"$set": {"status": "running", "claim_id": claim_id,
+                      "locked_until": now + timedelta(seconds=self.lease_seconds)},
+             "$inc": {"attempts": 1}}
+        )
+        return await self.jobs.find({"claim_id": claim_id, "status": "running"}).sort("priority", 1).to_list(None)
+
+    async def process_once(self) -> int:
+        claimed = await self.claim()
+        if not claimed:
+            return 0
+        by_channel: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for job in claimed:
+            by_channel[job["channel"]].append(job)
+        await asyncio.gather(*(self._deliver(channel, jobs) for channel, jobs in by_channel.items()))
+        return len(claimed)
+
+    async def _deliver(self, channel: str, jobs: List[Dict[str, Any]]) -> None:
+        transport = self.transports.get(channel)
+        try:
+            if transport is None:
+                errors = [f"no transport for channel {channel}"] * len(jobs)
+            else:
+                errors = await transport.send_batch(jobs)
+        except Exception as e:
+            errors = [str(e)] * len(jobs)
+        self.counters["batches"] += 1
+
+        now = datetime.now(timezone.utc)
+        updates = []
+        for job, error in zip(jobs, errors):
+            if error is None:
+                update = {"$set": {"status": "sent", "sent_at": now, "locked_until": None, "last_error": None}}
+                self.counters["sent"] += 1
+            elif job["attempts"] >= self.max_attempts:
+                update = {"$set": {"status": "failed", "failed_at": now, "locked_until": None, "last_error": error}}
+                self.counters["failed"] += 1
+                logger.error(f"Notification {job['job_id']} to {redact(job['recipient'])} failed permanently: {error}")
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (job["attempts"] - 1))
+                delay *= random.uniform(0.8, 1.2)
+                update = {"$set": {"status": "pending", "locked_until": None, "last_error": error,
+                                   "next_attempt_at": now + timedelta(seconds=delay)}}
+                self.counters["retried"] += 1
+            updates.append(UpdateOne({"_id": job["_id"], "claim_id": job["claim_id"]}, update))
+        await self.jobs.bulk_write(updates, ordered=False)
+
+    async def stats(self) -> Dict[str, Any]:
+        by_status = await self.jobs.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(None)
+        return {
+            "workers": len(self._tasks),
+            "queue": {row["_id"]: row["count"] for row in by_status},
+            **self.counters,
+        }
+
+
+def build_transports(spec: str, channels=("sms", "email")) -> Dict[str, Transport]:
+    """`spec` is "log", "loopback" or "file:<path>" (NOTIFY_TRANSPORT); anything else is a ValueError."""
+    if spec.startswith("file:") and len(spec) > len("file:"):
+        return {channel: FileTransport(channel, spec[len("file:"):]) for channel in channels}
+    if spec == "loopback":
+        return {channel: LoopbackTransport(channel) for channel in channels}
+    if spec == "log":
+        return {channel: LogTransport(channel) for channel in channels}
+    # A typo must not quietly turn SOS notifications into log lines.
+    raise ValueError(f"Unknown NOTIFY_TRANSPORT {spec!r}: expected log, loopback or file:<path>")
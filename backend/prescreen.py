@@ -0,0 +1,176 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# phrase -> (trigger, weight). Weights are combined noisy-or style, so two strong
+# signals push the score towards 1 without ever exceeding it.
+STRONG_PHRASES: Dict[str, Tuple[str, float]] = {
+    "help me": ("help", 0.6),
+    "please help": ("help", 0.6),
+    "somebody help": ("help", 0.8),
+    "someone help": ("help", 0.8),
+    "call the police": ("help", 0.8),
+    "call police": ("help", 0.8),
+    "call 911": ("help", 0.9),
+    "call 100": ("help", 0.9),
+    "call 112": ("help", 0.9),
+    "sos": ("help", 0.7),
+    "following me": ("stalking", 0.7),
+    "followed me": ("stalking", 0.6),
+    "being followed": ("stalking", 0.7),
+    "stalking me": ("stalking", 0.8),
+    "attacking me": ("violence", 0.9),
+    "attacked me": ("violence", 0.8),
+    "hitting me": ("violence", 0.9),
+    "hit me": ("violence", 0.7),
+    "hurting me": ("violence", 0.9),
+    "beating me": ("violence", 0.9),
+    "choking me": ("violence", 0.95),
+    "grabbed me": ("violence", 0.8),
+    "touching me": ("harassment", 0.7),
+    "groping": ("harassment", 0.8),
+    "molested": ("harassment", 0.9),
+    "assaulted": ("violence", 0.9),
+    "rape": ("violence", 0.95),
+    "raped": ("violence", 0.95),
+    "kidnapped": ("threat", 0.95),
+    "kidnap": ("threat", 0.8),
+    "abducted": ("threat", 0.95),
+    "has a knife": ("threat", 0.95),
+    "has a gun": ("threat", 0.95),
+    "kill me": ("threat", 0.9),
+    "going to kill": ("threat", 0.9),
+    "threatening me": ("threat", 0.8),
+    "threatened me": ("threat", 0.7),
+    "locked me in": ("threat", 0.9),
+    "won't let me leave": ("threat", 0.9),
+    "wont let me leave": ("threat", 0.9),
+    "can't escape": ("threat", 0.8),
+    "trapped": ("threat", 0.6),
+    "in danger": ("fear", 0.7),
+    "terrified": ("fear", 0.6),
+    "bleeding": ("medical", 0.7),
+    "drugged": ("threat", 0.9),
+    "forced me": ("violence", 0.8),
+}
+
+# Weak signals: on their own they make text ambiguous, never clearly urgent or benign.
+SOFT_PHRASES: Dict[str, Tuple[str, float]] = {
+    "scared": ("fear", 0.35),
+    "afraid": ("fear", 0.35),
+    "frightened": ("fear", 0.35),
+    "unsafe": ("fear", 0.4),
+    "nervous": ("fear", 0.2),
+    "worried": ("fear", 0.2),
+    "uncomfortable": ("harassment", 0.3),
+    "creepy": ("harassment", 0.3),
+    "staring at me": ("harassment", 0.35),
+    "harassing": ("harassment", 0.45),
+    "harassed": ("harassment", 0.45),
+    "alone": ("fear", 0.15),
+    "dark": ("fear", 0.1),
+    "drunk": ("threat", 0.2),
+    "angry": ("threat", 0.2),
+    "yelling": ("threat", 0.3),
+    "shouting": ("threat", 0.3),
+    "hurt": ("violence", 0.35),
+    "knife": ("threat", 0.4),
+    "gun": ("threat", 0.4),
+    "police": ("help", 0.2),
+    "emergency": ("help", 0.35),
+    "danger": ("fear", 0.4),
+    "stranger": ("fear", 0.15),
+    "weird guy": ("harassment", 0.3),
+    "lost": ("fear", 0.15),
+    "won't stop": ("harassment", 0.35),
+    "wont stop": ("harassment", 0.35),
+    "keeps calling": ("stalking", 0.3),
+    "keeps texting": ("stalking", 0.3),
+    "keeps following": ("stalking", 0.45),
+    "blocked him": ("stalking", 0.3),
+    "outside my door": ("stalking", 0.4),
+    "outside my house": ("stalking", 0.4),
+    "pressuring me": ("harassment", 0.35),
+    "panic": ("fear", 0.35),
+}
+
+# Negations and figurative framing flip or dilute meaning; any hit forces escalation.
+HEDGE_PATTERN = re.compile(
+    r"\b(?:not|no|never|isn't|wasn't|aren't|don't|didn't|nobody|movie|film|show|game|novel|book|song|joke|kidding|lol|lmao|haha|dream|hypothetically|story)\b"
+)
+
+URGENT_THRESHOLD = 0.85
+
+# Missing every phrase above doesn't make a text safe, so benign is only answered
+# locally on a positive signal: short messages made up entirely of greetings,
+# thanks and arrival/logistics phrases. Everything else goes to the LLM.
+BENIGN_PHRASES = (
+    r"hi", r"hello", r"hey", r"good (?:morning|afternoon|evening|night)",
+    r"thanks?", r"thank you(?: so much)?", r"ok(?:ay)?", r"sure", r"yes", r"yeah", r"bye",
+    r"see you(?: soon| later| tomorrow)?", r"love you", r"happy birthday", r"have a (?:great|good|nice) day",
+    r"(?:reached|got|back|i'm|i am) (?:home|office|work|college|school)(?: safely| safe| now)?",
+    r"reached(?: safely)?", r"home safe",
+    r"on my way(?: home| back)?", r"running late",
+    r"(?:will|i'll) be (?:home|there|back) (?:in|by) \d+(?: ?(?:mins?|minutes|am|pm))?",
+    r"booked the cab", r"arriving in \d+(?: ?(?:mins?|minutes))?",
+    r"call me (?:later|when you get a chance|when you're free)",
+)
+BENIGN_PATTERN = re.compile(
+    r"(?:{0})(?:[\s,.!?]+(?:{0}))*[\s.!?]*".format("|".join(p.replace(" ", r"\s+") for p in BENIGN_PHRASES))
+)
+MAX_BENIGN_CHARS = 60
+
+
+def _compile(phrases: Dict[str, Tuple[str, float]]) -> re.Pattern:
+    alternation = "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b")
+
+
+STRONG_PATTERN = _compile(STRONG_PHRASES)
+SOFT_PATTERN = _compile(SOFT_PHRASES)
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.replace("’", "'").replace("‘", "'").split()).casefold()
+
+
+def _hits(pattern: re.Pattern, phrases: Dict[str, Tuple[str, float]], text: str) -> List[Tuple[str, float]]:
+    return [phrases[" ".join(m.group(0).split())] for m in pattern.finditer(text)]
+
+
+def score(text: str) -> Dict[str, Any]:
+    text = normalize(text)
+    strong = _hits(STRONG_PATTERN, STRONG_PHRASES, text)
+    soft = _hits(SOFT_PATTERN, SOFT_PHRASES, text)
+    remaining = 1.0
+    for _, weight in strong + soft:
+        remaining *= 1.0 - weight
+    return {
+        "score": 1.0 - remaining,
+        "strong": strong,
+        "soft": soft,
+        "hedged": HEDGE_PATTERN.search(text) is not None,
+    }
+
+
+def prescreen(text: str) -> Optional[Dict[str, Any]]:
+    """Answer clearly urgent text, or short small talk, locally; None means ask the LLM."""
+    result = score(text)
+    if result["hedged"]:
+        return None
+    if result["strong"] and result["score"] >= URGENT_THRESHOLD:
+        triggers = sorted({trigger for trigger, _ in result["strong"] + result["soft"]})
+        return {
+            "distress_level": round(result["score"], 2),
+            "triggers": triggers,
+            "recommendation": "Trigger SOS and alert emergency contacts immediately",
+            "confidence": 0.9,
+        }
+    text = normalize(text)
+    if not result["strong"] and not result["soft"] and len(text) <= MAX_BENIGN_CHARS and BENIGN_PATTERN.fullmatch(text):
+        return {
+            "distress_level": 0.0,
+            "triggers": [],
+            "recommendation": "No distress detected",
+            "confidence": 0.8,
+        }
+    return None
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _running_stack(thread_id: int, root_frame) -> List[str]:
+    """Stack of the loop thread from `root_frame` (the task's coroutine) down to the running frame."""
+    frame = sys._current_frames().get(thread_id)
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        if frame is root_frame:
+            break
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(coro) -> List[str]:
+    """Follow a suspended coroutine's await chain down to whatever it is waiting on."""
+    stack = []
+    awaitable = coro
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            stack.append(f"<{type(awaitable).__name__}>")
+            break
+        stack.append(_frame_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) or getattr(awaitable, "ag_await", None)
+    return stack
+
+
+class _Session:
+    def __init__(self, task: asyncio.Task, thread_id: int):
+        self.task = task
+        self.coro = task.get_coro()
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.cpu_samples = 0
+        self.await_samples = 0
+
+    def sample(self) -> None:
+        if getattr(self.coro, "cr_running", False):
+            stack = _running_stack(self.thread_id, self.coro.cr_frame)
+            self.cpu_samples += 1
+            self.stacks[";".join(["cpu"] + stack)] += 1
+        else:
+            stack = _await_stack(self.coro)
+            self.await_samples += 1
+            self.stacks[";".join(["await"] + stack)] += 1
+
+
+class RequestProfiler:
+    """Sampling profiler for individual requests, split into CPU and await time.
+
+    A background thread wakes every `interval` seconds and looks at each profiled
+    request's task: if its coroutine is running, the loop thread's stack counts as a
+    CPU sample; otherwise the task's await chain counts as an await sample (I/O,
+    locks, or waiting for the loop to get to it). Finished profiles are kept as
+    collapsed stacks (flamegraph.pl / speedscope input) in a ring buffer.
+    """
+
+    def __init__(self, interval: float = 0.005, sample_rate: float = 0.0, token: Optional[str] = None, keep: int = 50):
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.token = token
+        self.profiles: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._active: Dict[int, _Session] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def wanted(self, header_token: Optional[bytes]) -> bool:
+        # Raw header bytes: any value a client sends must just fail to match, never raise.
+        if header_token and self.token and secrets.compare_digest(header_token, self.token.encode()):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                sessions = list(self._active.values())
+            for session in sessions:
+                try:
+                    session.sample()
+                except Exception:
+                    # The task can move under us between attribute reads; drop that sample.
+                    pass
+
+    def start(self) -> _Session:
+        session = _Session(asyncio.current_task(), threading.get_ident())
+        with self._lock:
+            self._active[id(session)] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def finish(self, session: _Session, profile_id: str, wall: float, **info) -> Dict[str, Any]:
+        with self._lock:
+            self._active.pop(id(session), None)
+        profile = {
+            "profile_id": profile_id,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            **info,
+            "wall_ms": round(wall * 1e3, 2),
+            "cpu_ms": round(session.cpu_samples * self.interval * 1e3, 2),
+            "await_ms": round(session.await_samples * self.interval * 1e3, 2),
+            "samples": session.cpu_samples + session.await_samples,
+            "collapsed": "".join(f"{stack} {count}\n" for stack, count in session.stacks.most_common()),
+        }
+        self.profiles.append(profile)
+        return profile
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return next((p for p in self.profiles if p["profile_id"] == profile_id), None)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        return [{k: v for k, v in p.items() if k != "collapsed"} for p in reversed(self.profiles)]
+
+
+class ProfilingMiddleware:
+    """Profiles requests carrying a valid X-Profile-Token header, plus a random sample of the rest.
+
+    Profiled responses carry an X-Profile-Id header naming the stored profile.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        header = next((v for k, v in scope["headers"] if k == b"x-profile-token"), None)
+        if not self.profiler.wanted(header):
+            return await self.app(scope, receive, send)
+
+        profile_id = f"prof_{uuid.uuid4().hex[:12]}"
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        session = self.profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.profiler.finish(
+                session, profile_id, time.perf_counter() - start,
+                method=scope["method"], path=scope["path"], route=getattr(route, "path", None), status=status,
+            )
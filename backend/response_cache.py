@@ -0,0 +1,73 @@
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Response
+from pymongo import ReturnDocument
+
+from cache import TTLCache
+
+Encoded = Tuple[bytes, Dict[str, str]]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ResponseCache:
+    """Pre-encoded response bodies keyed by (collection, collection version, request params).
+
+    Writers call `bump(collection)`; the counter lives in Mongo (`cache_versions`) so a bump
+    on one worker invalidates every worker's entries within `sync_interval` seconds.
+    Bodies are served with a strong ETag and answered with 304 on If-None-Match.
+    """
+
+    def __init__(self, db, maxsize: int = 512, ttl: float = 300.0, sync_interval: float = 1.0):
+        self.db = db
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.sync_interval = sync_interval
+        self.versions: Dict[str, int] = {}
+        self._synced_at = 0.0
+        self.not_modified = 0
+
+    async def _sync_versions(self) -> None:
+        if time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        docs = await self.db.cache_versions.find({}).to_list(None)
+        self.versions = {doc["_id"]: doc.get("version", 0) for doc in docs}
+        self._synced_at = time.monotonic()
+
+    async def bump(self, collection: str) -> None:
+        doc = await self.db.cache_versions.find_one_and_update(
+            {"_id": collection}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        self.versions[collection] = doc["version"]
+
+    async def serve(
+        self,
+        collection: str,
+        params: Hashable,
+        produce: Callable[[], Awaitable[Encoded]],
+        if_none_match: Optional[str],
+        max_age: int,
+    ) -> Response:
+        await self._sync_versions()
+        key = (collection, self.versions.get(collection, 0), params)
+        entry = self.entries.get(key)
+        if entry is None:
+            body, headers = await produce()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            entry = (body, {**headers, "ETag": etag, "Cache-Control": f"public, max-age={max_age}"})
+            self.entries.set(key, entry)
+
+        body, headers = entry
+        if etag_matches(if_none_match, headers["ETag"]):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.entries.stats(), "not_modified": self.not_modified, "versions": dict(self.versions)}
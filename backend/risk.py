@@ -0,0 +1,128 @@
+import asyncio
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+from geo import METERS_PER_DEGREE_LAT, geohash_bounds, geohash_encode, geohashes_covering, haversine_m
+
+NearestZone = Callable[[float, float], Awaitable[Optional[Tuple[float, Dict[str, Any]]]]]
+
+# Incident weight at which the incident part of the score reaches ~63%.
+INCIDENT_SCALE = 2.0
+INCIDENT_WEIGHT = 0.75
+ZONE_WEIGHT = 0.25
+
+
+def level_for(score: int) -> str:
+    if score >= 60:
+        return "high"
+    if score >= 30:
+        return "moderate"
+    return "low"
+
+
+class RiskScorer:
+    """Location risk from recent nearby reports and distance to the nearest safety zone.
+
+    Each report within `radius_m` adds severity/5, decayed by age (halving every
+    `half_life_hours`) and by distance (linearly to zero at the radius). The sum maps
+    to 0..1 via 1 - exp(-sum / INCIDENT_SCALE). The zone part grows linearly with
+    distance to the nearest verified zone, saturating at `zone_far_m`.
+
+    Scores are computed for, and cached per, geohash cell at `precision` (~150 m at 7),
+    so nearby points share one computation. A new report invalidates every cell
+    overlapping the bounding box of its radius.
+    """
+
+    def __init__(self, db, nearest_zone: NearestZone, precision: int = 7, radius_m: float = 500.0,
+                 half_life_hours: float = 72.0, lookback_days: float = 30.0, zone_far_m: float = 2000.0,
+                 maxsize: int = 20000, ttl: float = 300.0, concurrency: int = 8):
+        self.db = db
+        self.nearest_zone = nearest_zone
+        self.precision = precision
+        self.radius_m = radius_m
+        self.half_life_hours = half_life_hours
+        self.lookback = timedelta(days=lookback_days)
+        self.zone_far_m = zone_far_m
+        self.cells = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._limit = asyncio.Semaphore(concurrency)
+
+    def _bbox(self, lat: float, lng: float) -> Tuple[float, float, float, float]:
+        dlat = self.radius_m / METERS_PER_DEGREE_LAT
+        dlng = self.radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+    async def _compute(self, cell: str) -> Dict[str, Any]:
+        bounds = geohash_bounds(cell)
+        lat = (bounds["south"] + bounds["north"]) / 2
+        lng = (bounds["west"] + bounds["east"]) / 2
+        south, west, north, east = self._bbox(lat, lng)
+        now = datetime.now(timezone.utc)
+        async with self._limit:
+            reports = await self.db.community_reports.find(
+                {"location.latitude": {"$gte": south, "$lte": north},
+                 "location.longitude": {"$gte": west, "$lte": east},
+                 "timestamp": {"$gte": now - self.lookback}},
+                {"_id": 0, "location": 1, "severity": 1, "timestamp": 1}
+            ).to_list(None)
+            nearest = await self.nearest_zone(lat, lng)
+
+        incident = 0.0
+        counted = 0
+        for report in reports:
+            distance = haversine_m(lat, lng, report["location"]["latitude"], report["location"]["longitude"])
+            if distance > self.radius_m:
+                continue
+            age_hours = max(0.0, (now - report["timestamp"]).total_seconds() / 3600)
+            decay = 0.5 ** (age_hours / self.half_life_hours)
+            incident += (report.get("severity") or 0) / 5 * decay * (1 - distance / self.radius_m)
+            counted += 1
+
+        incident_risk = 1 - math.exp(-incident / INCIDENT_SCALE)
+        zone_distance = nearest[0] if nearest else None
+        zone_risk = 1.0 if zone_distance is None else min(1.0, zone_distance / self.zone_far_m)
+        score = round(100 * (INCIDENT_WEIGHT * incident_risk + ZONE_WEIGHT * zone_risk))
+        return {
+            "cell": cell,
+            "score": score,
+            "level": level_for(score),
+            "reports": counted,
+            "incident_weight": round(incident, 3),
+            "nearest_zone": None if nearest is None else {
+                "zone_id": nearest[1].get("zone_id"),
+                "name": nearest[1].get("name"),
+                "type": nearest[1].get("type"),
+                "distance": round(nearest[0]),
+            },
+            "computed_at": now,
+        }
+
+    async def score_points(self, points: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        cells = [geohash_encode(lat, lng, self.precision) for lat, lng in points]
+        scores: Dict[str, Dict[str, Any]] = {}
+        for cell in dict.fromkeys(cells):
+            cached = self.cells.get(cell)
+            if cached is not None:
+                scores[cell] = cached
+        missing = [cell for cell in dict.fromkeys(cells) if cell not in scores]
+        for result in await asyncio.gather(*(self._compute(cell) for cell in missing)):
+            self.cells.set(result["cell"], result)
+            scores[result["cell"]] = result
+        return [
+            {"latitude": lat, "longitude": lng, **scores[cell]}
+            for (lat, lng), cell in zip(points, cells)
+        ]
+
+    def invalidate_point(self, lat: float, lng: float) -> int:
+        removed = 0
+        for cell in geohashes_covering(*self._bbox(lat, lng), self.precision):
+            if self.cells.pop(cell) is not None:
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        self.cells.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cells.stats()
@@ -0,0 +1,76 @@
+"""Multi-process launcher for the API.
+
+Starts one uvicorn worker process per available CPU core (or --workers / WEB_CONCURRENCY).
+Each worker runs the app lifespan on its own: it opens its own Mongo pool
+(MONGO_MIN_POOL_SIZE..MONGO_MAX_POOL_SIZE connections), starts serving and warms up in the
+background. /api/health/live answers immediately; /api/health/ready returns 503 until the
+worker has connected, ensured indexes and primed its caches. Point load balancer and
+orchestrator readiness probes at the latter.
+
+    cd backend
+    python serve.py                      # workers = cores
+    python serve.py --workers 4 --port 8001
+
+Under gunicorn the equivalent is
+
+    gunicorn server:app -k uvicorn.workers.UvicornWorker -w "$(nproc)" -b 0.0.0.0:8001
+
+Size MONGO_MAX_POOL_SIZE so that workers * pool stays within the server's connection limit.
+In-process state is per worker and kept in step through Mongo:
+
+- logout, resolved alerts, new reports and zone changes are published to
+  `cache_invalidations` and applied by every other worker within CACHE_SYNC_INTERVAL
+  (principal cache, alert state, tile clusters, risk scores, in-memory zone index);
+- a live location stream on a worker other than the one receiving the pings follows the
+  alert's last_location and status, polled every LOCATION_SYNC_INTERVAL, so it lags by
+  up to LOCATION_FLUSH_INTERVAL + LOCATION_SYNC_INTERVAL;
+- the public list caches sync their versions through `cache_versions`.
+
+With more than one worker, Prometheus metrics are aggregated through PROMETHEUS_MULTIPROC_DIR,
+which this launcher sets up.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "0")) or available_cores())
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        metrics_dir = tempfile.mkdtemp(prefix="safeher-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    else:
+        metrics_dir = None
+
+    try:
+        uvicorn.run(
+            "server:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            log_level=args.log_level,
+            timeout_graceful_shutdown=30,
+        )
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
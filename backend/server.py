@@ -1,113 +1,243 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Header, Response, Cookie
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Query, Request, Response, Cookie, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 import os
+import json
+import base64
+import binascii
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
+import asyncio
+import secrets
+import time
 from datetime import datetime, timezone, timedelta
 import httpx
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from cache import TTLCache
+from indexes import ensure_indexes, index_drift
+from geo import GeoGridIndex, geo_point, tiles_covering
+from tiles import MAX_ZOOM, TileClusterCache
+from fastjson import TrustedRows
+from distress import DistressAnalyzer, fallback_result, preload_llm
+from notifications import NotificationDispatcher, alert_jobs, build_transports
+from location_stream import LocationHub, LocationWriter, RESOLVED, parse_ping
+from alert_state import ActiveAlertCache
+from models import (
+    AnalyzeDistressBatchRequest, AnalyzeDistressRequest, CommunityReport, CreateContactRequest, EmergencyAlert,
+    EmergencyContact, FakeCallRequest, RiskScoreRequest, SafetyZone, SubmitReportRequest, TriggerEmergencyRequest, User,
+)
+from idempotency import MAX_KEY_LENGTH, TriggerDeduper
+from invalidation import InvalidationFeed
+from response_cache import ResponseCache, etag_matches
+import heatmap
+from risk import RiskScorer, level_for
+from import_zones import FORMATS as ZONE_IMPORT_FORMATS, import_zones, records_for
+from admission import AdmissionController, Overloaded, PriorityClass
+from profiling import ProfilingMiddleware, RequestProfiler
+from metrics import MetricsMiddleware, MongoCommandListener, release_worker_metrics, render as render_metrics, track_outbound
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Pool sizes are per worker process: N workers open up to N * MONGO_MAX_POOL_SIZE connections.
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+# tz_aware: timestamps are stored as BSON dates and come back as UTC-aware datetimes.
+client = AsyncIOMotorClient(
+    mongo_url,
+    tz_aware=True,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=int(os.environ.get('MONGO_MAX_IDLE_MS', '300000')),
+    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    event_listeners=[MongoCommandListener()]
+)
 db = client[os.environ['DB_NAME']]
 
+# Session token -> (User, session expiry). Entries never outlive the session itself.
+principal_cache = TTLCache(
+    maxsize=int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('PRINCIPAL_CACHE_TTL', '60')),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.warmup = {"ready": False}
+    app.state.index_report = None
+    global http_client
+    http_client = httpx.AsyncClient(
+        http2=os.environ.get('OUTBOUND_HTTP2', 'true').lower() in ('1', 'true', 'yes'),
+        limits=httpx.Limits(
+            max_connections=int(os.environ.get('OUTBOUND_MAX_CONNECTIONS', '100')),
+            max_keepalive_connections=int(os.environ.get('OUTBOUND_MAX_KEEPALIVE', '20')),
+            keepalive_expiry=float(os.environ.get('OUTBOUND_KEEPALIVE_EXPIRY', '60'))
+        ),
+        timeout=httpx.Timeout(
+            float(os.environ.get('OUTBOUND_TIMEOUT', '10')),
+            connect=float(os.environ.get('OUTBOUND_CONNECT_TIMEOUT', '3'))
+        )
+    )
+    notification_dispatcher.start()
+    location_writer.start()
+    invalidations.start()
+    # The worker serves (and answers liveness) right away; /api/health/ready flips once this is done.
+    warmup_task = asyncio.create_task(warm_up(app))
+    yield
+    warmup_task.cancel()
+    await asyncio.gather(warmup_task, return_exceptions=True)
+    await invalidations.stop()
+    await location_writer.stop()
+    await notification_dispatcher.stop()
+    await http_client.aclose()
+    client.close()
+    release_worker_metrics()
+
+async def warm_up(app: FastAPI):
+    started = time.perf_counter()
+    while True:
+        try:
+            await client.admin.command("ping")
+            break
+        except Exception as e:
+            logger.warning(f"Waiting for MongoDB: {e}")
+            await asyncio.sleep(1)
+    # Open the minimum pool now rather than on the first requests.
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)))
+    try:
+        app.state.index_report = await ensure_indexes(db)
+    except Exception as e:
+        # Don't keep the API down over index trouble; /admin/indexes shows the state.
+        logger.error(f"Index bootstrap failed: {e}")
+        app.state.index_report = {"error": str(e)}
+    try:
+        await backfill_zone_geo()
+        await refresh_zone_index()
+    except Exception as e:
+        logger.error(f"Safety zone geo bootstrap failed: {e}")
+    try:
+        # Prime the response cache for the two public lists every client loads first.
+        await get_safety_zones(if_none_match=None)
+        await get_reports(limit=50, cursor=None, if_none_match=None)
+    except Exception as e:
+        logger.error(f"Cache warm-up failed: {e}")
+    app.state.warmup = {"ready": True, "seconds": round(time.perf_counter() - started, 3)}
+    logger.info(f"Worker {os.getpid()} ready after {app.state.warmup['seconds']}s warm-up")
+    if LLM_PRELOAD:
+        # After readiness on purpose: only the distress routes need the SDK, and they load it on demand anyway.
+        try:
+            logger.info(f"LLM SDK preloaded in {await preload_llm():.2f}s")
+        except Exception as e:
+            logger.error(f"LLM SDK preload failed: {e}")
+
+# Shared outbound HTTP client (pooled, keep-alive); opened and closed by the app lifespan.
+http_client: Optional[httpx.AsyncClient] = None
+OAUTH_SESSION_URL = os.environ.get('OAUTH_SESSION_URL', "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data")
+
+# Optional in-process spatial index for nearby-zone lookups; Mongo's 2dsphere index is used otherwise.
+zone_index = GeoGridIndex() if os.environ.get('ZONE_SPATIAL_INDEX') == 'memory' else None
+
+tile_clusters = TileClusterCache(
+    maxsize=int(os.environ.get('TILE_CACHE_SIZE', '4096')),
+    ttl=float(os.environ.get('TILE_CACHE_TTL', '3600')),
+)
+MAX_TILES_PER_VIEW = 64
+
+# Import the LLM SDK in the background once the worker is ready, instead of on the first distress request.
+LLM_PRELOAD = os.environ.get('LLM_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+distress_analyzer = DistressAnalyzer(
+    maxsize=int(os.environ.get('DISTRESS_CACHE_SIZE', '2048')),
+    ttl=float(os.environ.get('DISTRESS_CACHE_TTL', '600')),
+    use_prescreen=os.environ.get('DISTRESS_PRESCREEN', 'true').lower() in ('1', 'true', 'yes'),
+    # Shared by single and batch requests: the most LLM calls this worker has in flight.
+    concurrency=int(os.environ.get('DISTRESS_LLM_CONCURRENCY', '8')),
+)
+
+# Background fan-out of emergency notifications; the trigger endpoint only enqueues.
+notification_dispatcher = NotificationDispatcher(
+    db,
+    build_transports(os.environ.get('NOTIFY_TRANSPORT', 'log')),
+    workers=int(os.environ.get('NOTIFY_WORKERS', '2')),
+    batch_size=int(os.environ.get('NOTIFY_BATCH_SIZE', '50')),
+    max_attempts=int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '5')),
+)
+
+# Live location sharing for active alerts: in-memory fan-out, write-behind persistence.
+location_hub = LocationHub()
+location_writer = LocationWriter(
+    db,
+    flush_interval=float(os.environ.get('LOCATION_FLUSH_INTERVAL', '2')),
+    min_interval=float(os.environ.get('LOCATION_MIN_INTERVAL', '1')),
+)
+# Pings pushed to another worker only reach this one's streams through the alert's last_location.
+LOCATION_SYNC_INTERVAL = float(os.environ.get('LOCATION_SYNC_INTERVAL', '2'))
+LOCATION_KEEPALIVE = 15
+
+# Per-user active alert + ETag. Kept short-lived since other workers can change the state too.
+active_alerts = ActiveAlertCache(
+    maxsize=int(os.environ.get('ACTIVE_ALERT_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('ACTIVE_ALERT_CACHE_TTL', '10')),
+)
+
+# Duplicate SOS suppression: retries with the same Idempotency-Key, and repeat taps within the window, get the first alert back.
+trigger_dedupe = TriggerDeduper(
+    window=float(os.environ.get('TRIGGER_DEDUPE_WINDOW', '30')),
+    key_ttl=float(os.environ.get('IDEMPOTENCY_KEY_TTL', '86400')),
+    maxsize=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000')),
+)
+
+# Other workers' writes reach this worker's in-memory state (tiles, risk, zone index, principals,
+# alert state) through Mongo within CACHE_SYNC_INTERVAL seconds.
+invalidations = InvalidationFeed(db, sync_interval=float(os.environ.get('CACHE_SYNC_INTERVAL', '1')))
+
+# Pre-encoded public list responses, invalidated by per-collection version counters.
+response_cache = ResponseCache(
+    db,
+    maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', '512')),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '300')),
+)
+ZONES_MAX_AGE = int(os.environ.get('ZONES_MAX_AGE', '300'))
+REPORTS_MAX_AGE = int(os.environ.get('REPORTS_MAX_AGE', '15'))
+
+# Admission control: SOS routes are always admitted; other classes queue briefly, then get 503 + Retry-After.
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', 'true').lower() in ('1', 'true', 'yes')
+admission = AdmissionController(
+    capacity=int(os.environ.get('ADMISSION_CAPACITY', '256')),
+    classes={
+        "critical": PriorityClass(rank=0, exempt=True),
+        "high": PriorityClass(rank=1, queue=256, max_wait=5.0, retry_after=1),
+        "normal": PriorityClass(rank=2, limit=int(os.environ.get('ADMISSION_NORMAL_LIMIT', '128')),
+                                queue=128, max_wait=2.0, retry_after=2),
+        "low": PriorityClass(rank=3, limit=int(os.environ.get('ADMISSION_LOW_LIMIT', '32')),
+                             queue=64, max_wait=1.0, retry_after=5),
+    },
+)
+
+# Opt-in request profiling: requests with X-Profile-Token == PROFILE_TOKEN, plus a random PROFILE_SAMPLE_RATE share.
+request_profiler = RequestProfiler(
+    interval=float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000,
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+    token=os.environ.get('PROFILE_TOKEN') or None,
+    keep=int(os.environ.get('PROFILE_KEEP', '50')),
+)
+
+# X-Admin-Token for admin routes that write data (bulk zone import); unset keeps them disabled.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or None
+
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
-# Models
-class User(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    user_id: str
-    email: EmailStr
-    name: str
-    picture: Optional[str] = None
-    phone: Optional[str] = None
-    created_at: datetime
-    emergency_settings: Optional[Dict[str, Any]] = None
-
-class EmergencyContact(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    contact_id: str = Field(default_factory=lambda: f"contact_{uuid.uuid4().hex[:12]}")
-    user_id: str
-    name: str
-    relationship: str
-    phone: str
-    email: Optional[EmailStr] = None
-    is_primary: bool = False
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class EmergencyAlert(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    alert_id: str = Field(default_factory=lambda: f"alert_{uuid.uuid4().hex[:12]}")
-    user_id: str
-    type: str
-    status: str
-    location: Dict[str, Any]
-    triggered_at: datetime
-    resolved_at: Optional[datetime] = None
-    contacts_notified: List[str] = Field(default_factory=list)
-    evidence: Optional[List[str]] = None
-
-class CommunityReport(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    report_id: str = Field(default_factory=lambda: f"report_{uuid.uuid4().hex[:12]}")
-    user_id: Optional[str] = None
-    type: str
-    severity: int
-    location: Dict[str, Any]
-    description: str
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    anonymous: bool = True
-    status: str = "pending"
-
-class SafetyZone(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    zone_id: str = Field(default_factory=lambda: f"zone_{uuid.uuid4().hex[:12]}")
-    name: str
-    type: str
-    location: Dict[str, float]
-    address: str
-    contact: Optional[str] = None
-    hours: str = "24/7"
-    verified: bool = True
-    facilities: List[str] = Field(default_factory=list)
-
-class CreateContactRequest(BaseModel):
-    name: str
-    relationship: str
-    phone: str
-    email: Optional[EmailStr] = None
-    is_primary: bool = False
-
-class TriggerEmergencyRequest(BaseModel):
-    type: str = "manual"
-    location: Dict[str, Any]
-    evidence: Optional[List[str]] = None
-
-class SubmitReportRequest(BaseModel):
-    type: str
-    severity: int
-    location: Dict[str, Any]
-    description: str
-    anonymous: bool = True
-
-class FakeCallRequest(BaseModel):
-    caller_name: str = "Mom"
-
-class AnalyzeDistressRequest(BaseModel):
-    text: str
-    location: Optional[Dict[str, Any]] = None
+# Opt-in: list endpoints skip response_model re-validation and encode with orjson.
+FAST_RESPONSES = os.environ.get('FAST_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+contact_rows = TrustedRows(EmergencyContact)
+report_rows = TrustedRows(CommunityReport)
+zone_rows = TrustedRows(SafetyZone)
 
 # Authentication Helper
 async def get_current_user(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)) -> User:
@@ -117,46 +247,144 @@ async def get_current_user(authorization: Optional[str] = Header(None), session_
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    cached = principal_cache.get(token)
+    if cached:
+        user, expires_at = cached
+        if expires_at >= datetime.now(timezone.utc):
+            return user
+        principal_cache.pop(token)
+    
     session_doc = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
     if not session_doc:
         raise HTTPException(status_code=401, detail="Invalid session")
     
     expires_at = session_doc["expires_at"]
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at < datetime.now(timezone.utc):
+    now = datetime.now(timezone.utc)
+    if expires_at < now:
         raise HTTPException(status_code=401, detail="Session expired")
     
     user_doc = await db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if isinstance(user_doc["created_at"], str):
-        user_doc["created_at"] = datetime.fromisoformat(user_doc["created_at"])
-    
-    return User(**user_doc)
+    user = User(**user_doc)
+    principal_cache.set(token, (user, expires_at), ttl=min(principal_cache.ttl, (expires_at - now).total_seconds()))
+    return user
+
+def invalidate_principals(user_id: str) -> int:
+    return principal_cache.discard_where(lambda token, entry: entry[0].user_id == user_id)
+
+# Local effects of writes, applied directly by the worker that made them and through `invalidations` by the rest.
+def forget_report_area(latitude: float, longitude: float):
+    tile_clusters.invalidate_point(latitude, longitude)
+    risk_scorer.invalidate_point(latitude, longitude)
+
+async def reload_zones():
+    await refresh_zone_index()
+    risk_scorer.clear()
+
+def forget_alert(alert_id: str, user_id: str):
+    location_hub.close(alert_id)
+    active_alerts.invalidate(user_id)
+    trigger_dedupe.forget(user_id)
+
+invalidations.on("logout", invalidate_principals)
+invalidations.on("principal", invalidate_principals)
+invalidations.on("report", forget_report_area)
+invalidations.on("zones", reload_zones)
+invalidations.on("alert_resolved", forget_alert)
+
+async def broadcast(kind: str, **data: Any):
+    try:
+        await invalidations.publish(kind, **data)
+    except Exception as e:
+        # The write itself succeeded; other workers catch up when their cache entries expire.
+        logger.error(f"Failed to publish {kind} invalidation: {e}")
+
+def require_token(expected: Optional[str], supplied: Optional[str]):
+    # No configured token means the route is off, not open.
+    if not (expected and supplied and secrets.compare_digest(supplied.encode(), expected.encode())):
+        raise HTTPException(status_code=403, detail="Invalid or missing token")
+
+class AdmissionSlot:
+    def __init__(self, priority: str, held: bool):
+        self.priority = priority
+        self.held = held
+        self.handed_off = False
+
+    def release(self):
+        if self.held:
+            self.held = False
+            admission.release(self.priority)
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """Keeps the route's admission slot until the body has been sent.
+
+    Yield dependencies exit before a streaming body runs, so routes doing their work in
+    the stream hand their slot over to the response instead.
+    """
+
+    def __init__(self, content, slot: AdmissionSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+        slot.handed_off = True
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+def admit(priority: str):
+    async def dependency():
+        if not ADMISSION_CONTROL:
+            yield AdmissionSlot(priority, held=False)
+            return
+        try:
+            await admission.acquire(priority)
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail="Server busy, retry later", headers={"Retry-After": str(e.retry_after)})
+        slot = AdmissionSlot(priority, held=True)
+        try:
+            yield slot
+        finally:
+            if not slot.handed_off:
+                slot.release()
+    return Depends(dependency)
 
 # Add your routes to the router instead of directly to app
+# Health: liveness is unconditional, readiness waits for warm-up.
+@api_router.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    warmup = getattr(app.state, "warmup", {"ready": False})
+    if not warmup["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", **warmup}
+
 @api_router.get("/")
 async def root():
     return {"message": "SafeHer API is running", "status": "healthy"}
 
 # Auth Endpoints
-@api_router.get("/auth/session")
+@api_router.get("/auth/session", dependencies=[admit("high")])
 async def exchange_session(x_session_id: str = Header(...)):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers={"X-Session-ID": x_session_id}
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Session exchange failed")
-        
-        data = response.json()
+    try:
+        with track_outbound("oauth"):
+            response = await http_client.get(OAUTH_SESSION_URL, headers={"X-Session-ID": x_session_id})
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Session exchange timed out")
+    except httpx.HTTPError as e:
+        logger.error(f"Session exchange error: {e}")
+        raise HTTPException(status_code=502, detail="Session exchange failed")
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Session exchange failed")
+    
+    data = response.json()
     
     user_id = f"user_{uuid.uuid4().hex[:12]}"
     existing_user = await db.users.find_one({"email": data["email"]}, {"_id": 0})
@@ -168,16 +396,19 @@ async def exchange_session(x_session_id: str = Header(...)):
             {"$set": {
                 "name": data["name"],
                 "picture": data["picture"],
-                "last_active": datetime.now(timezone.utc).isoformat()
+                "last_active": datetime.now(timezone.utc)
             }}
         )
+        # Every worker's cached principals still carry the old name and picture.
+        invalidate_principals(user_id)
+        await broadcast("principal", user_id=user_id)
     else:
         await db.users.insert_one({
             "user_id": user_id,
             "email": data["email"],
             "name": data["name"],
             "picture": data["picture"],
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": datetime.now(timezone.utc),
             "emergency_settings": {
                 "auto_detect": True,
                 "alert_contacts": True,
@@ -197,32 +428,33 @@ async def exchange_session(x_session_id: str = Header(...)):
     user_doc = await db.users.find_one({"user_id": user_id}, {"_id": 0})
     return {**user_doc, "session_token": session_token}
 
-@api_router.get("/auth/me")
+@api_router.get("/auth/me", dependencies=[admit("high")])
 async def get_me(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
     return user
 
-@api_router.post("/auth/logout")
+@api_router.post("/auth/logout", dependencies=[admit("high")])
 async def logout(response: Response, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     try:
         user = await get_current_user(authorization, session_token)
         await db.user_sessions.delete_many({"user_id": user.user_id})
+        invalidate_principals(user.user_id)
+        await broadcast("logout", user_id=user.user_id)
         response.delete_cookie("session_token", path="/")
         return {"message": "Logged out successfully"}
     except:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
 # Emergency Contacts Endpoints
-@api_router.get("/emergency/contacts", response_model=List[EmergencyContact])
+@api_router.get("/emergency/contacts", response_model=List[EmergencyContact], dependencies=[admit("high")])
 async def get_contacts(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
-    contacts = await db.emergency_contacts.find({"user_id": user.user_id}, {"_id": 0}).to_list(100)
-    for contact in contacts:
-        if isinstance(contact.get("created_at"), str):
-            contact["created_at"] = datetime.fromisoformat(contact["created_at"])
+    contacts = await db.emergency_contacts.find({"user_id": user.user_id}, contact_rows.projection).to_list(100)
+    if FAST_RESPONSES:
+        return contact_rows.response(contacts)
     return contacts
 
-@api_router.post("/emergency/contacts", response_model=EmergencyContact)
+@api_router.post("/emergency/contacts", response_model=EmergencyContact, dependencies=[admit("high")])
 async def create_contact(request: CreateContactRequest, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
     contact = EmergencyContact(
@@ -230,11 +462,10 @@ async def create_contact(request: CreateContactRequest, authorization: Optional[
         **request.model_dump()
     )
     doc = contact.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     await db.emergency_contacts.insert_one(doc)
     return contact
 
-@api_router.delete("/emergency/contacts/{contact_id}")
+@api_router.delete("/emergency/contacts/{contact_id}", dependencies=[admit("high")])
 async def delete_contact(contact_id: str, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
     result = await db.emergency_contacts.delete_one({"contact_id": contact_id, "user_id": user.user_id})
@@ -243,61 +474,247 @@ async def delete_contact(contact_id: str, authorization: Optional[str] = Header(
     return {"message": "Contact deleted"}
 
 # Emergency Alert Endpoints
-@api_router.post("/emergency/trigger", response_model=EmergencyAlert)
-async def trigger_emergency(request: TriggerEmergencyRequest, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
+@api_router.post("/emergency/trigger", response_model=EmergencyAlert, dependencies=[admit("critical")])
+async def trigger_emergency(request: TriggerEmergencyRequest, response: Response, idempotency_key: Optional[str] = Header(None), authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
     
+    async with trigger_dedupe.lock(user.user_id):
+        alert = trigger_dedupe.lookup(user.user_id, idempotency_key) or await find_duplicate_alert(user.user_id, idempotency_key)
+        if alert is None:
+            alert = await create_alert(user, request, idempotency_key)
+        else:
+            response.headers["Idempotent-Replayed"] = "true"
+        trigger_dedupe.remember(user.user_id, idempotency_key, alert)
+    return alert
+
+async def find_duplicate_alert(user_id: str, idempotency_key: Optional[str]) -> Optional[EmergencyAlert]:
+    # Covers retries and taps that reached another worker, or this one after a restart.
+    doc = None
+    if idempotency_key:
+        doc = await db.emergency_alerts.find_one({"user_id": user_id, "idempotency_key": idempotency_key}, {"_id": 0})
+    if doc is None and trigger_dedupe.window > 0:
+        doc = await db.emergency_alerts.find_one(
+            {"user_id": user_id, "status": "active",
+             "triggered_at": {"$gte": datetime.now(timezone.utc) - timedelta(seconds=trigger_dedupe.window)}},
+            {"_id": 0},
+            sort=[("triggered_at", -1)]
+        )
+    if doc is None:
+        return None
+    trigger_dedupe.replayed += 1
+    return EmergencyAlert(**doc)
+
+async def create_alert(user: User, request: TriggerEmergencyRequest, idempotency_key: Optional[str]) -> EmergencyAlert:
     contacts = await db.emergency_contacts.find({"user_id": user.user_id}, {"_id": 0}).to_list(100)
     contact_ids = [c["contact_id"] for c in contacts]
     
+    # BSON dates keep milliseconds; truncate so this alert serializes (and ETags) the same as its stored copy.
+    now = datetime.now(timezone.utc)
     alert = EmergencyAlert(
         user_id=user.user_id,
         type=request.type,
         status="active",
         location=request.location,
-        triggered_at=datetime.now(timezone.utc),
+        triggered_at=now.replace(microsecond=now.microsecond // 1000 * 1000),
         contacts_notified=contact_ids,
         evidence=request.evidence
     )
     
     doc = alert.model_dump()
-    doc["triggered_at"] = doc["triggered_at"].isoformat()
-    await db.emergency_alerts.insert_one(doc)
+    # Lets trusted contacts without an account follow the live location stream.
+    doc["share_token"] = secrets.token_urlsafe(16)
+    if idempotency_key:
+        doc["idempotency_key"] = idempotency_key
+    try:
+        await db.emergency_alerts.insert_one(doc)
+    except DuplicateKeyError:
+        # Another worker stored this key first; its alert is the one to return, and it has notified.
+        existing = await find_duplicate_alert(user.user_id, idempotency_key)
+        if existing is None:
+            raise
+        return existing
+    active_alerts.set(user.user_id, alert, alert.model_dump_json())
+    
+    try:
+        await notification_dispatcher.enqueue(alert_jobs(doc, user.model_dump(), contacts))
+    except Exception as e:
+        # The alert itself is stored; don't fail the SOS because the queue write did.
+        logger.error(f"Failed to enqueue notifications for {alert.alert_id}: {e}")
     
     return alert
 
-@api_router.get("/emergency/active", response_model=Optional[EmergencyAlert])
-async def get_active_emergency(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
+async def load_active_alert(user_id: str):
+    entry = active_alerts.get(user_id)
+    if entry is None:
+        doc = await db.emergency_alerts.find_one(
+            {"user_id": user_id, "status": "active"},
+            {"_id": 0},
+            sort=[("triggered_at", -1)]
+        )
+        alert = EmergencyAlert(**doc) if doc else None
+        entry = active_alerts.set(user_id, alert, alert.model_dump_json() if alert else None)
+    return entry
+
+def active_alert_response(alert: Optional[EmergencyAlert], etag: str, if_none_match: Optional[str], response: Response):
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return alert
+
+@api_router.get("/emergency/active", response_model=Optional[EmergencyAlert], dependencies=[admit("high")])
+async def get_active_emergency(response: Response, if_none_match: Optional[str] = Header(None), authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
-    alert = await db.emergency_alerts.find_one(
-        {"user_id": user.user_id, "status": "active"},
-        {"_id": 0},
-        sort=[("triggered_at", -1)]
-    )
-    if alert:
-        if isinstance(alert["triggered_at"], str):
-            alert["triggered_at"] = datetime.fromisoformat(alert["triggered_at"])
-        if alert.get("resolved_at") and isinstance(alert["resolved_at"], str):
-            alert["resolved_at"] = datetime.fromisoformat(alert["resolved_at"])
-        return EmergencyAlert(**alert)
-    return None
-
-@api_router.post("/emergency/resolve/{alert_id}")
+    alert, etag = await load_active_alert(user.user_id)
+    return active_alert_response(alert, etag, if_none_match, response)
+
+@api_router.get("/emergency/active/wait", response_model=Optional[EmergencyAlert])
+async def wait_active_emergency(response: Response, timeout: float = 25, if_none_match: Optional[str] = Header(None), authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
+    user = await get_current_user(authorization, session_token)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(max(timeout, 0), 60)
+    while True:
+        alert, etag = await load_active_alert(user.user_id)
+        remaining = deadline - loop.time()
+        if not etag_matches(if_none_match, etag) or remaining <= 0:
+            return active_alert_response(alert, etag, if_none_match, response)
+        # Wake up at least once per cache TTL to pick up changes made by other workers.
+        await active_alerts.wait_for_change(user.user_id, min(remaining, active_alerts.entries.ttl))
+
+@api_router.post("/emergency/resolve/{alert_id}", dependencies=[admit("critical")])
 async def resolve_emergency(alert_id: str, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
     result = await db.emergency_alerts.update_one(
         {"alert_id": alert_id, "user_id": user.user_id},
         {"$set": {
             "status": "resolved",
-            "resolved_at": datetime.now(timezone.utc).isoformat()
+            "resolved_at": datetime.now(timezone.utc)
         }}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Alert not found")
+    forget_alert(alert_id, user.user_id)
+    await broadcast("alert_resolved", alert_id=alert_id, user_id=user.user_id)
     return {"message": "Emergency resolved"}
 
+# Live Location Endpoints
+async def get_owned_active_alert(alert_id: str, user_id: str) -> Dict[str, Any]:
+    alert = await db.emergency_alerts.find_one(
+        {"alert_id": alert_id, "user_id": user_id, "status": "active"},
+        {"_id": 0, "alert_id": 1, "user_id": 1}
+    )
+    if not alert:
+        raise HTTPException(status_code=404, detail="Active alert not found")
+    return alert
+
+def record_ping(alert_id: str, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    ping = parse_ping(data)
+    location_hub.publish(alert_id, ping)
+    location_writer.add(alert_id, user_id, ping)
+    return ping
+
+@api_router.websocket("/emergency/{alert_id}/location/ws")
+async def push_location(websocket: WebSocket, alert_id: str, token: Optional[str] = None):
+    try:
+        user = await get_current_user(
+            websocket.headers.get("authorization") or (f"Bearer {token}" if token else None),
+            websocket.cookies.get("session_token")
+        )
+        await get_owned_active_alert(alert_id, user.user_id)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    
+    await websocket.accept()
+    resolved = asyncio.Event()
+
+    async def close_on_resolve(queue: asyncio.Queue):
+        # The hub is closed when the alert is resolved here or, through the invalidation feed, elsewhere.
+        while await queue.get() is not RESOLVED:
+            pass
+        resolved.set()
+        await websocket.close(code=1000, reason="Alert resolved")
+
+    with location_hub.subscribe(alert_id) as queue:
+        watcher = asyncio.create_task(close_on_resolve(queue))
+        try:
+            while not resolved.is_set():
+                try:
+                    data = await websocket.receive_json()
+                    if resolved.is_set():
+                        break
+                    record_ping(alert_id, user.user_id, data)
+                except (KeyError, TypeError, ValueError) as e:
+                    if resolved.is_set():
+                        break
+                    await websocket.send_json({"error": f"Invalid ping: {e}"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+
+@api_router.post("/emergency/{alert_id}/location", dependencies=[admit("critical")])
+async def post_location(alert_id: str, request: Dict[str, Any], authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
+    user = await get_current_user(authorization, session_token)
+    await get_owned_active_alert(alert_id, user.user_id)
+    try:
+        ping = record_ping(alert_id, user.user_id, request)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid ping: {e}")
+    return {**ping, "ts": ping["ts"].isoformat()}
+
+@api_router.get("/emergency/{alert_id}/location/stream")
+async def stream_location(alert_id: str, share_token: Optional[str] = None, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
+    query = {"alert_id": alert_id, "status": "active"}
+    if share_token:
+        query["share_token"] = share_token
+    else:
+        user = await get_current_user(authorization, session_token)
+        query["user_id"] = user.user_id
+    alert = await db.emergency_alerts.find_one(query, {"_id": 0, "last_location": 1, "location": 1})
+    if not alert:
+        raise HTTPException(status_code=404, detail="Active alert not found")
+    
+    async def events():
+        loop = asyncio.get_running_loop()
+        last_ts = None
+        with location_hub.subscribe(alert_id) as queue:
+            if alert_id not in location_hub.last:
+                initial = alert.get("last_location") or alert.get("location")
+                if initial:
+                    last_ts = initial.get("ts")
+                    yield f"event: location\ndata: {json.dumps(initial, default=json_default)}\n\n"
+            last_sent = loop.time()
+            while True:
+                try:
+                    ping = await asyncio.wait_for(queue.get(), timeout=LOCATION_SYNC_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Nothing local: the alert may be resolved, or be pinging, through another worker.
+                    current = await db.emergency_alerts.find_one({"alert_id": alert_id}, {"_id": 0, "status": 1, "last_location": 1})
+                    if not current or current.get("status") != "active":
+                        ping = RESOLVED
+                    elif (current.get("last_location") or {}).get("ts") and (last_ts is None or current["last_location"]["ts"] > last_ts):
+                        ping = current["last_location"]
+                    elif loop.time() - last_sent >= LOCATION_KEEPALIVE:
+                        last_sent = loop.time()
+                        yield ": keep-alive\n\n"
+                        continue
+                    else:
+                        continue
+                if ping is RESOLVED:
+                    yield "event: resolved\ndata: {}\n\n"
+                    return
+                last_ts = ping.get("ts")
+                last_sent = loop.time()
+                yield f"event: location\ndata: {json.dumps(ping, default=json_default)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # Community Reports Endpoints
-@api_router.post("/community/reports", response_model=CommunityReport)
+@api_router.post("/community/reports", response_model=CommunityReport, dependencies=[admit("low")])
 async def submit_report(request: SubmitReportRequest, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
     report = CommunityReport(
@@ -305,44 +722,203 @@ async def submit_report(request: SubmitReportRequest, authorization: Optional[st
         **request.model_dump()
     )
     doc = report.model_dump()
-    doc["timestamp"] = doc["timestamp"].isoformat()
     await db.community_reports.insert_one(doc)
+    if "latitude" in report.location and "longitude" in report.location:
+        forget_report_area(report.location["latitude"], report.location["longitude"])
+        await broadcast("report", latitude=report.location["latitude"], longitude=report.location["longitude"])
+    try:
+        await heatmap.record_report(db, doc)
+    except Exception as e:
+        # The rollup can be regenerated with `python heatmap.py`; don't fail the report over it.
+        logger.error(f"Heatmap update for {report.report_id} failed: {e}")
+    await response_cache.bump("community_reports")
     return report
 
-@api_router.get("/community/reports", response_model=List[CommunityReport])
-async def get_reports(limit: int = 50):
-    reports = await db.community_reports.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-    for report in reports:
-        if isinstance(report["timestamp"], str):
-            report["timestamp"] = datetime.fromisoformat(report["timestamp"])
-    return reports
+def json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+# Opaque keyset cursor over the (timestamp, report_id) sort order.
+# Reports written before migrate_timestamps.py has run still hold ISO strings. BSON sorts
+# every string after every date in this (descending) order, so pages walk the dates first
+# and then the legacy strings; a cursor taken on a legacy row is marked as such.
+LEGACY_CURSOR = "s"
+
+def encode_report_cursor(report: Dict[str, Any]) -> str:
+    timestamp = report["timestamp"]
+    if isinstance(timestamp, datetime):
+        key = [timestamp.isoformat(), report["report_id"]]
+    else:
+        key = [str(timestamp), report["report_id"], LEGACY_CURSOR]
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_report_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, report_id, *kind = json.loads(raw)
+        if kind not in ([], [LEGACY_CURSOR]) or not isinstance(timestamp, str):
+            raise ValueError("unknown cursor")
+        if not kind:
+            timestamp = datetime.fromisoformat(timestamp)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    after = [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "report_id": {"$lt": report_id}}
+    ]
+    if not kind:
+        # $lt on a date never matches strings, so the legacy rows past it are added explicitly.
+        after.append({"timestamp": {"$type": "string"}})
+    return {"$or": after}
+
+REPORT_SORT = [("timestamp", -1), ("report_id", -1)]
+REPORTS_PAGE_MAX = int(os.environ.get('REPORTS_PAGE_MAX', '200'))
+EXPORT_BATCH_MAX = int(os.environ.get('EXPORT_BATCH_MAX', '5000'))
+
+@api_router.get("/community/reports", response_model=List[CommunityReport], dependencies=[admit("normal")])
+async def get_reports(limit: int = Query(50, ge=1, le=REPORTS_PAGE_MAX), cursor: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+    async def produce():
+        query = decode_report_cursor(cursor) if cursor else {}
+        reports = await db.community_reports.find(query, report_rows.projection).sort(REPORT_SORT).limit(limit).to_list(limit)
+        headers = {}
+        if reports and len(reports) == limit:
+            headers["X-Next-Cursor"] = encode_report_cursor(reports[-1])
+        return report_rows.encode(reports, validate=not FAST_RESPONSES), headers
+    
+    return await response_cache.serve("community_reports", (limit, cursor), produce, if_none_match, REPORTS_MAX_AGE)
+
+@api_router.get("/community/reports/export")
+async def export_reports(batch_size: int = Query(1000, ge=1, le=EXPORT_BATCH_MAX), slot: AdmissionSlot = admit("low")):
+    async def rows():
+        cursor = db.community_reports.find({}, {"_id": 0}).sort(REPORT_SORT).batch_size(batch_size)
+        async for report in cursor:
+            yield json.dumps(report, default=json_default) + "\n"
+    
+    return AdmittedStreamingResponse(
+        rows(),
+        slot,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=community_reports.ndjson"}
+    )
+
+@api_router.get("/community/reports/tiles", dependencies=[admit("normal")])
+async def get_report_tiles(south: float, west: float, north: float, east: float, zoom: int = 13):
+    zoom = max(0, min(zoom, MAX_ZOOM))
+    tiles = tiles_covering(south, west, north, east, zoom)
+    if len(tiles) > MAX_TILES_PER_VIEW:
+        raise HTTPException(status_code=400, detail="Viewport too large for zoom level")
+    results = await asyncio.gather(*(tile_clusters.get(db, zoom, x, y) for x, y in tiles))
+    return {"zoom": zoom, "tiles": [tile for tile in results if tile["count"]]}
+
+@api_router.get("/community/heatmap", dependencies=[admit("normal")])
+async def get_report_heatmap(south: float, west: float, north: float, east: float, precision: Optional[int] = None):
+    chosen = heatmap.pick_precision(south, west, north, east, precision)
+    if chosen is None:
+        raise HTTPException(status_code=400, detail="Viewport too large for precision")
+    return {"precision": chosen, "cells": await heatmap.query(db, south, west, north, east, chosen)}
 
 # Safety Zones Endpoints
-@api_router.get("/safety/zones", response_model=List[SafetyZone])
-async def get_safety_zones():
-    zones = await db.safety_zones.find({"verified": True}, {"_id": 0}).to_list(100)
-    return zones
-
-@api_router.post("/safety/zones/nearby")
-async def get_nearby_zones(latitude: float, longitude: float, radius: float = 5000):
-    zones = await db.safety_zones.find({"verified": True}, {"_id": 0}).to_list(100)
+async def backfill_zone_geo():
+    # Zones written before the 2dsphere index existed only carry {"latitude", "longitude"}.
+    async for zone in db.safety_zones.find({"geo": {"$exists": False}}, {"zone_id": 1, "location": 1}):
+        await db.safety_zones.update_one({"_id": zone["_id"]}, {"$set": {"geo": geo_point(zone["location"])}})
+
+async def refresh_zone_index():
+    if zone_index is None:
+        return
+    zones = db.safety_zones.find({"verified": True}, {"_id": 0, "geo": 0})
+    zone_index.rebuild([
+        (zone["zone_id"], zone["location"]["latitude"], zone["location"]["longitude"], zone)
+        async for zone in zones
+    ])
+
+@api_router.get("/safety/zones", response_model=List[SafetyZone], dependencies=[admit("normal")])
+async def get_safety_zones(if_none_match: Optional[str] = Header(None)):
+    async def produce():
+        zones = await db.safety_zones.find({"verified": True}, zone_rows.projection).to_list(100)
+        return zone_rows.encode(zones, validate=not FAST_RESPONSES), {}
     
-    # Simple distance calculation
-    nearby = []
-    for zone in zones:
-        lat_diff = abs(zone["location"]["latitude"] - latitude)
-        lng_diff = abs(zone["location"]["longitude"] - longitude)
-        distance = ((lat_diff ** 2 + lng_diff ** 2) ** 0.5) * 111000  # rough conversion to meters
-        
-        if distance <= radius:
-            zone["distance"] = round(distance)
-            nearby.append(zone)
+    return await response_cache.serve("safety_zones", "verified", produce, if_none_match, ZONES_MAX_AGE)
+
+NEARBY_ZONES_MAX = int(os.environ.get('NEARBY_ZONES_MAX', '200'))
+NEARBY_RADIUS_MAX_M = float(os.environ.get('NEARBY_RADIUS_MAX_M', '50000'))
+
+@api_router.post("/safety/zones/nearby", dependencies=[admit("normal")])
+async def get_nearby_zones(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius: float = Query(5000, gt=0, le=NEARBY_RADIUS_MAX_M),
+    limit: int = Query(50, ge=1, le=NEARBY_ZONES_MAX),
+    skip: int = Query(0, ge=0),
+):
+    if zone_index is not None:
+        return [
+            {**zone, "distance": round(distance)}
+            for distance, zone in zone_index.nearby(latitude, longitude, radius, limit=limit, skip=skip)
+        ]
     
-    nearby.sort(key=lambda x: x["distance"])
+    pipeline = [
+        {"$geoNear": {
+            "near": geo_point({"latitude": latitude, "longitude": longitude}),
+            "key": "geo",
+            "distanceField": "distance",
+            "maxDistance": radius,
+            "query": {"verified": True},
+            "spherical": True
+        }},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "geo": 0}}
+    ]
+    nearby = await db.safety_zones.aggregate(pipeline).to_list(limit)
+    for zone in nearby:
+        zone["distance"] = round(zone["distance"])
     return nearby
 
+async def nearest_safety_zone(latitude: float, longitude: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+    if zone_index is not None:
+        hits = zone_index.nearby(latitude, longitude, RISK_ZONE_SEARCH_M, limit=1)
+        return hits[0] if hits else None
+    nearest = await db.safety_zones.aggregate([
+        {"$geoNear": {
+            "near": geo_point({"latitude": latitude, "longitude": longitude}),
+            "key": "geo",
+            "distanceField": "distance",
+            "maxDistance": RISK_ZONE_SEARCH_M,
+            "query": {"verified": True},
+            "spherical": True
+        }},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "zone_id": 1, "name": 1, "type": 1, "distance": 1}}
+    ]).to_list(1)
+    return (nearest[0]["distance"], nearest[0]) if nearest else None
+
+# Risk scores per geohash cell; a report invalidates the cells around it, zone changes clear everything.
+RISK_ZONE_SEARCH_M = float(os.environ.get('RISK_ZONE_SEARCH_M', '10000'))
+risk_scorer = RiskScorer(
+    db,
+    nearest_safety_zone,
+    radius_m=float(os.environ.get('RISK_RADIUS_M', '500')),
+    half_life_hours=float(os.environ.get('RISK_HALF_LIFE_HOURS', '72')),
+    maxsize=int(os.environ.get('RISK_CACHE_SIZE', '20000')),
+    ttl=float(os.environ.get('RISK_CACHE_TTL', '300')),
+)
+
+@api_router.post("/risk/score", dependencies=[admit("normal")])
+async def score_risk(request: RiskScoreRequest):
+    scores = await risk_scorer.score_points([(p.latitude, p.longitude) for p in request.points])
+    peak = max(score["score"] for score in scores)
+    return {
+        "points": scores,
+        "max_score": peak,
+        "mean_score": round(sum(score["score"] for score in scores) / len(scores), 1),
+        "level": level_for(peak)
+    }
+
 # Fake Call Endpoint
-@api_router.post("/fake-call")
+@api_router.post("/fake-call", dependencies=[admit("low")])
 async def generate_fake_call(request: FakeCallRequest, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
     return {
@@ -353,40 +929,85 @@ async def generate_fake_call(request: FakeCallRequest, authorization: Optional[s
     }
 
 # AI Distress Detection using Gemini 3 Flash
-@api_router.post("/ai/analyze-distress")
+@api_router.post("/ai/analyze-distress", dependencies=[admit("low")])
 async def analyze_distress(request: AnalyzeDistressRequest, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
     user = await get_current_user(authorization, session_token)
     
     try:
-        chat = LlmChat(
-            api_key=os.environ["EMERGENT_LLM_KEY"],
-            session_id=f"distress_{user.user_id}_{uuid.uuid4().hex[:8]}",
-            system_message="You are an AI assistant analyzing text for distress signals in a women's safety app. Analyze the given text and determine if it indicates distress, danger, or emergency. Respond ONLY with a JSON object containing: {\"distress_level\": (0-1 float), \"triggers\": [array of detected triggers like 'fear', 'threat', 'violence'], \"recommendation\": \"action to take\"}. Be sensitive and accurate."
-        ).with_model("gemini", "gemini-3-flash-preview")
-        
-        user_message = UserMessage(text=f"Analyze this text for distress: {request.text}")
-        response = await chat.send_message(user_message)
-        
-        # Parse the response
-        import json
-        result = json.loads(response)
-        
-        return {
-            "distress_level": result.get("distress_level", 0),
-            "triggers": result.get("triggers", []),
-            "recommendation": result.get("recommendation", "Monitor situation"),
-            "confidence": 0.85,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+        result = await distress_analyzer.analyze(request.text, user.user_id)
     except Exception as e:
         logging.error(f"AI analysis error: {e}")
-        return {
-            "distress_level": 0.5,
-            "triggers": ["analysis_error"],
-            "recommendation": "Unable to analyze, recommend manual review",
-            "confidence": 0.3,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+        result = fallback_result()
+    
+    return {**result, "timestamp": datetime.now(timezone.utc).isoformat()}
+
+@api_router.post("/ai/analyze-distress/batch")
+async def analyze_distress_batch(request: AnalyzeDistressBatchRequest, slot: AdmissionSlot = admit("low"), authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
+    user = await get_current_user(authorization, session_token)
+    
+    async def rows():
+        results = distress_analyzer.analyze_many(
+            request.texts,
+            user.user_id,
+            pack_size=int(os.environ.get('DISTRESS_BATCH_PACK_SIZE', '8'))
+        )
+        async for index, result in results:
+            yield json.dumps({"index": index, **result, "timestamp": datetime.now(timezone.utc).isoformat()}) + "\n"
+    
+    return AdmittedStreamingResponse(rows(), slot, media_type="application/x-ndjson")
+
+# Cache Stats
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats():
+    return {
+        "principal": principal_cache.stats(),
+        "report_tiles": tile_clusters.tiles.stats(),
+        "distress": distress_analyzer.stats(),
+        "active_alerts": active_alerts.stats(),
+        "trigger_dedupe": trigger_dedupe.stats(),
+        "responses": response_cache.stats(),
+        "invalidations": invalidations.stats(),
+        "risk": risk_scorer.stats()
+    }
+
+# Index Status
+@api_router.get("/admin/indexes")
+async def get_index_status():
+    return {"drift": await index_drift(db), "startup": app.state.index_report}
+
+@api_router.get("/admin/location-stream")
+async def get_location_stream_status():
+    return {**location_hub.stats(), **location_writer.stats()}
+
+@api_router.get("/admin/notifications")
+async def get_notification_status():
+    return await notification_dispatcher.stats()
+
+# Request profiles
+@api_router.get("/admin/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    require_token(request_profiler.token, x_profile_token)
+    return request_profiler.summaries()
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "json", x_profile_token: Optional[str] = Header(None)):
+    require_token(request_profiler.token, x_profile_token)
+    profile = request_profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return Response(content=profile["collapsed"], media_type="text/plain")
+    return profile
+
+@api_router.get("/admin/admission")
+async def get_admission_status():
+    return {"enabled": ADMISSION_CONTROL, **admission.stats()}
+
+# Prometheus metrics
+@api_router.get("/metrics")
+async def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 # Seed Safety Zones
 @api_router.post("/admin/seed-zones")
@@ -430,10 +1051,43 @@ async def seed_safety_zones():
     for zone in zones:
         existing = await db.safety_zones.find_one({"name": zone["name"]})
         if not existing:
+            zone["geo"] = geo_point(zone["location"])
             await db.safety_zones.insert_one(zone)
+    await reload_zones()
+    await response_cache.bump("safety_zones")
+    await broadcast("zones")
     
     return {"message": f"Seeded {len(zones)} safety zones"}
 
+# Bulk zone import: raw CSV / GeoJSON / GeoJSON-lines request body, streamed in chunks.
+@api_router.post("/admin/zones/import")
+async def import_safety_zones(request: Request, format: Optional[str] = None, chunk_size: int = 1000, dry_run: bool = False, x_admin_token: Optional[str] = Header(None)):
+    require_token(ADMIN_TOKEN, x_admin_token)
+    content_type = request.headers.get("content-type", "")
+    if format is None:
+        format = "csv" if "csv" in content_type else "geojsonl" if "seq" in content_type or "ndjson" in content_type else "geojson"
+    if format not in ZONE_IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(ZONE_IMPORT_FORMATS)}")
+
+    progress = []
+    def on_chunk(report):
+        progress.append(report)
+        logger.info(f"Zone import chunk {report['chunk']}: {report['rows']} rows read, {report['inserted']} inserted, {report['updated']} updated")
+
+    try:
+        summary = await import_zones(
+            db, records_for(format, request.stream()), SafetyZone,
+            chunk_size=max(1, min(chunk_size, 10000)), dry_run=dry_run, on_chunk=on_chunk
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed {format} input after {len(progress)} chunks: {e}")
+    finally:
+        if progress and not dry_run:
+            await reload_zones()
+            await response_cache.bump("safety_zones")
+            await broadcast("zones")
+    return {**summary, "progress": progress}
+
 app.include_router(api_router)
 
 cors_origins = os.environ.get('CORS_ORIGINS', '*')
@@ -448,14 +1102,13 @@ app.add_middleware(
     allow_origins=cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Cache-Control", "X-Profile-Id", "Idempotent-Replayed"],
 )
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+app.add_middleware(MetricsMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+logger = logging.getLogger(__name__)
\ No newline at end of file
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List
+
+from cache import TTLCache
+from geo import tile_bounds, tile_for
+
+# Each tile is split into GRID x GRID cells; every non-empty cell becomes one cluster.
+GRID = 8
+MAX_ZOOM = 18
+
+
+def tile_key(zoom: int, x: int, y: int) -> str:
+    return f"{zoom}/{x}/{y}"
+
+
+def cluster_pipeline(zoom: int, x: int, y: int) -> List[Dict[str, Any]]:
+    b = tile_bounds(zoom, x, y)
+    cell_lat = (b["north"] - b["south"]) / GRID
+    cell_lng = (b["east"] - b["west"]) / GRID
+    return [
+        {"$match": {
+            "location.latitude": {"$gte": b["south"], "$lt": b["north"]},
+            "location.longitude": {"$gte": b["west"], "$lt": b["east"]},
+        }},
+        {"$project": {
+            "_id": 0,
+            "severity": 1,
+            "lat": "$location.latitude",
+            "lng": "$location.longitude",
+            "cy": {"$floor": {"$divide": [{"$subtract": ["$location.latitude", b["south"]]}, cell_lat]}},
+            "cx": {"$floor": {"$divide": [{"$subtract": ["$location.longitude", b["west"]]}, cell_lng]}},
+        }},
+        {"$group": {
+            "_id": {"cx": "$cx", "cy": "$cy", "severity": "$severity"},
+            "count": {"$sum": 1},
+            "sum_lat": {"$sum": "$lat"},
+            "sum_lng": {"$sum": "$lng"},
+        }},
+        {"$group": {
+            "_id": {"cx": "$_id.cx", "cy": "$_id.cy"},
+            "count": {"$sum": "$count"},
+            "sum_lat": {"$sum": "$sum_lat"},
+            "sum_lng": {"$sum": "$sum_lng"},
+            "severity": {"$push": {"k": {"$toString": "$_id.severity"}, "v": "$count"}},
+        }},
+    ]
+
+
+class TileClusterCache:
+    """Per-tile cluster summaries of community reports, computed once and kept until a report lands in the tile."""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600.0):
+        self.tiles = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, db, zoom: int, x: int, y: int) -> Dict[str, Any]:
+        key = tile_key(zoom, x, y)
+        tile = self.tiles.get(key)
+        if tile is None:
+            rows = await db.community_reports.aggregate(cluster_pipeline(zoom, x, y)).to_list(GRID * GRID)
+            tile = {
+                "key": key,
+                "bbox": tile_bounds(zoom, x, y),
+                "count": sum(row["count"] for row in rows),
+                "clusters": [
+                    {
+                        "centroid": {
+                            "latitude": row["sum_lat"] / row["count"],
+                            "longitude": row["sum_lng"] / row["count"],
+                        },
+                        "count": row["count"],
+                        "severity": {item["k"]: item["v"] for item in row["severity"]},
+                    }
+                    for row in rows
+                ],
+            }
+            self.tiles.set(key, tile)
+        return tile
+
+    def invalidate_point(self, lat: float, lng: float) -> None:
+        for zoom in range(MAX_ZOOM + 1):
+            self.tiles.pop(tile_key(zoom, *tile_for(lat, lng, zoom)))
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Overloaded, PriorityClass
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def controller(capacity=1, **overrides):
+    classes = {
+        "critical": PriorityClass(rank=0, exempt=True),
+        "high": PriorityClass(rank=1, queue=10, max_wait=1.0),
+        "low": PriorityClass(rank=3, limit=1, queue=1, max_wait=0.05, retry_after=5),
+    }
+    classes.update(overrides)
+    return AdmissionController(capacity=capacity, classes=classes)
+
+
+def test_exempt_is_admitted_over_capacity():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("high")
+        await admission.acquire("critical")
+        assert admission.in_flight == 2
+
+    asyncio.run(scenario())
+
+
+def test_freed_slot_goes_to_higher_priority_first():
+    async def scenario():
+        admission = controller(low=PriorityClass(rank=3, queue=10, max_wait=1.0))
+        await admission.acquire("high")
+        order = []
+
+        async def wait(name):
+            await admission.acquire(name)
+            order.append(name)
+
+        low = asyncio.create_task(wait("low"))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(wait("high"))
+        await asyncio.sleep(0)
+        admission.release("high")
+        await settle()
+        assert order == ["high"]
+        admission.release("high")
+        await asyncio.gather(low, high)
+        assert order == ["high", "low"]
+
+    asyncio.run(scenario())
+
+
+def test_shed_when_queue_full_or_wait_exceeded():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("high")
+        waiting = asyncio.create_task(admission.acquire("low"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await admission.acquire("low")
+        assert full.value.retry_after == 5
+        with pytest.raises(Overloaded):
+            await waiting
+        assert admission.stats()["classes"]["low"] == {"running": 0, "queued": 0, "admitted": 0, "shed": 2}
+
+    asyncio.run(scenario())
+
+
+def test_class_limit_applies_below_capacity():
+    async def scenario():
+        admission = controller(capacity=10)
+        await admission.acquire("low")
+        with pytest.raises(Overloaded):
+            await admission.acquire("low")
+        await admission.acquire("high")
+        assert admission.in_flight == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue_and_keeps_no_slot():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("high")
+        waiting = asyncio.create_task(admission.acquire("high"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert admission.stats()["classes"]["high"]["queued"] == 0
+        admission.release("high")
+        assert admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_wake_hands_the_slot_back():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("high")
+        waiting = asyncio.create_task(admission.acquire("high"))
+        await asyncio.sleep(0)
+        # The slot is granted and the client goes away before the waiter runs again. Depending
+        # on the Python version wait_for either raises or returns; either way no slot leaks.
+        admission.release("high")
+        waiting.cancel()
+        try:
+            await waiting
+            held = 1
+        except asyncio.CancelledError:
+            held = 0
+        assert admission.in_flight == admission.running["high"] == held
+
+    asyncio.run(scenario())
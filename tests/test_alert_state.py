@@ -0,0 +1,64 @@
+import asyncio
+
+from alert_state import ActiveAlertCache, etag_for
+
+
+def test_etag_depends_only_on_the_body():
+    assert etag_for('{"alert_id":"a1"}') == etag_for('{"alert_id":"a1"}')
+    assert etag_for('{"alert_id":"a1"}') != etag_for('{"alert_id":"a2"}')
+    assert etag_for(None) == etag_for("null")
+    assert etag_for(None).startswith('"') and etag_for(None).endswith('"')
+
+
+def test_set_returns_the_entry_and_get_reads_it_back():
+    alerts = ActiveAlertCache()
+    entry = alerts.set("u1", {"alert_id": "a1"}, '{"alert_id":"a1"}')
+    assert entry == ({"alert_id": "a1"}, etag_for('{"alert_id":"a1"}'))
+    assert alerts.get("u1") == entry
+    alerts.invalidate("u1")
+    assert alerts.get("u1") is None
+
+
+def test_long_poll_wakes_on_a_new_etag_only():
+    alerts = ActiveAlertCache()
+    alerts.set("u1", None, None)
+
+    async def run():
+        waiter = asyncio.ensure_future(alerts.wait_for_change("u1", 1))
+        await asyncio.sleep(0)
+        alerts.set("u1", None, None)  # same body, same ETag: keep waiting
+        await asyncio.sleep(0.01)
+        unchanged = waiter.done()
+        alerts.set("u1", {"alert_id": "a1"}, '{"alert_id":"a1"}')
+        return unchanged, await waiter
+
+    unchanged, changed = asyncio.run(run())
+    assert unchanged is False
+    assert changed is True
+
+
+def test_invalidate_wakes_every_waiter_for_that_user_only():
+    alerts = ActiveAlertCache()
+
+    async def run():
+        mine = [asyncio.ensure_future(alerts.wait_for_change("u1", 1)) for _ in range(3)]
+        other = asyncio.ensure_future(alerts.wait_for_change("u2", 0.05))
+        await asyncio.sleep(0)
+        alerts.invalidate("u1")
+        return await asyncio.gather(*mine), await other
+
+    mine, other = asyncio.run(run())
+    assert mine == [True, True, True]
+    assert other is False
+
+
+def test_timed_out_polls_leave_nothing_behind():
+    alerts = ActiveAlertCache()
+
+    async def run():
+        results = await asyncio.gather(*(alerts.wait_for_change(f"u{i % 3}", 0.01) for i in range(9)))
+        return results, alerts.stats()["waiting_users"]
+
+    results, waiting = asyncio.run(run())
+    assert results == [False] * 9
+    assert waiting == 0
@@ -0,0 +1,46 @@
+import time
+
+from cache import TTLCache
+
+
+def test_get_set_and_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    now[0] += 6
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_non_positive_ttl_drops_the_entry():
+    cache = TTLCache(ttl=60)
+    cache.set("a", 1)
+    cache.set("a", 2, ttl=0)
+    assert cache.get("a") is None
+
+
+def test_pop_discard_where_and_stats():
+    cache = TTLCache(ttl=60)
+    for key in range(5):
+        cache.set(key, key * 10)
+    assert cache.pop(0) == 0
+    assert cache.pop(0, "missing") == "missing"
+    assert cache.discard_where(lambda key, value: value >= 30) == 2
+    assert sorted(cache._data) == [1, 2]
+    cache.get(1)
+    cache.get(99)
+    assert cache.stats()["hit_ratio"] == 0.5
@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+
+import distress
+from distress import DistressAnalyzer, content_key
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Stub LLM: records prompts, answers after `delay`, fails while `fail` > 0."""
+    state = {"calls": [], "delay": 0.01, "fail": 0}
+
+    async def ask_llm(text, session_id):
+        state["calls"].append(text)
+        await asyncio.sleep(state["delay"])
+        if state["fail"]:
+            state["fail"] -= 1
+            raise RuntimeError("llm unavailable")
+        return distress._shape({"distress_level": 0.4, "triggers": ["fear"]})
+
+    monkeypatch.setattr(distress, "ask_llm", ask_llm)
+    return state
+
+
+def test_identical_texts_share_one_call_and_then_hit_the_cache(llm):
+    analyzer = DistressAnalyzer(use_prescreen=False)
+
+    async def run():
+        first = await asyncio.gather(*(analyzer.analyze("He keeps   following me", "u1") for _ in range(5)))
+        again = await analyzer.analyze("he keeps following me", "u2")
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert llm["calls"] == ["He keeps   following me"]
+    assert {result["source"] for result in first} == {"llm"}
+    assert analyzer.coalesced == 4
+    assert again["source"] == "cache"
+    assert analyzer.stats()["inflight"] == 0
+
+
+def test_failures_reach_every_waiter_and_are_not_cached(llm):
+    analyzer = DistressAnalyzer(use_prescreen=False)
+    llm["fail"] = 1
+
+    async def run():
+        results = await asyncio.gather(*(analyzer.analyze("where am I", "u1") for _ in range(3)), return_exceptions=True)
+        return results, await analyzer.analyze("where am I", "u1")
+
+    results, retry = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retry["source"] == "llm"
+    assert len(llm["calls"]) == 2
+    assert analyzer.llm_errors == 1
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call(llm):
+    analyzer = DistressAnalyzer(use_prescreen=False)
+    llm["delay"] = 0.05
+
+    async def run():
+        leaving = asyncio.ensure_future(analyzer.analyze("someone is outside", "u1"))
+        staying = asyncio.ensure_future(analyzer.analyze("someone is outside", "u2"))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(run())["source"] == "llm"
+    assert len(llm["calls"]) == 1
+    assert analyzer.results.get(content_key("someone is outside")) is not None
+
+
+@pytest.fixture
+def batch_llm(monkeypatch, llm):
+    """Adds a packed-prompt stub to `llm` and tracks how many calls run at once."""
+    llm.update(packs=[], pack_fail=0, running=0, peak=0)
+    single = distress.ask_llm
+
+    async def measured(call):
+        llm["running"] += 1
+        llm["peak"] = max(llm["peak"], llm["running"])
+        try:
+            return await call
+        finally:
+            llm["running"] -= 1
+
+    async def ask_llm(text, session_id):
+        return await measured(single(text, session_id))
+
+    async def ask_llm_batch(texts, session_id):
+        async def answer():
+            llm["packs"].append(list(texts))
+            await asyncio.sleep(llm["delay"])
+            if llm["pack_fail"]:
+                llm["pack_fail"] -= 1
+                raise ValueError("expected 3 results")
+            return [distress._shape({"distress_level": 0.2}) for _ in texts]
+        return await measured(answer())
+
+    monkeypatch.setattr(distress, "ask_llm", ask_llm)
+    monkeypatch.setattr(distress, "ask_llm_batch", ask_llm_batch)
+    return llm
+
+
+async def collect(analyzer, texts, user_id="u1", pack_size=8):
+    return [result async for result in analyzer.analyze_many(texts, user_id, pack_size=pack_size)]
+
+
+def test_batch_packs_texts_and_keeps_input_order(batch_llm):
+    analyzer = DistressAnalyzer(use_prescreen=False)
+    texts = ["one", "two", "ONE", "three", "four", "five"]
+
+    results = asyncio.run(collect(analyzer, texts, pack_size=2))
+    assert [index for index, _ in results] == list(range(len(texts)))
+    assert batch_llm["packs"] == [["one", "two"], ["three", "four"]]
+    assert batch_llm["calls"] == ["five"]
+    assert {result["source"] for _, result in results} == {"llm"}
+
+
+def test_failed_pack_falls_back_to_single_calls(batch_llm):
+    analyzer = DistressAnalyzer(use_prescreen=False)
+    batch_llm["pack_fail"] = 1
+    batch_llm["fail"] = 1
+
+    results = asyncio.run(collect(analyzer, ["a", "b", "c"]))
+    assert batch_llm["packs"] == [["a", "b", "c"]]
+    assert sorted(batch_llm["calls"]) == ["a", "b", "c"]
+    # One single call failed too: that text gets the fallback, the rest are answered.
+    assert sorted(result["source"] for _, result in results) == ["fallback", "llm", "llm"]
+
+
+def test_single_request_joins_a_pack_in_flight(batch_llm):
+    analyzer = DistressAnalyzer(use_prescreen=False)
+    batch_llm["delay"] = 0.05
+
+    async def run():
+        batch = asyncio.ensure_future(collect(analyzer, ["x", "y", "z"]))
+        await asyncio.sleep(0.01)
+        single = await analyzer.analyze("Y", "u2")
+        return single, await batch
+
+    single, _ = asyncio.run(run())
+    assert single["source"] == "llm"
+    assert batch_llm["calls"] == [] and len(batch_llm["packs"]) == 1
+    assert analyzer.coalesced == 1
+
+
+def test_llm_concurrency_is_shared_across_batch_requests(batch_llm):
+    analyzer = DistressAnalyzer(use_prescreen=False, concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(
+            collect(analyzer, [f"request {n} text {i}" for i in range(4)], user_id=f"u{n}", pack_size=2)
+            for n in range(4)
+        ))
+
+    asyncio.run(run())
+    assert len(batch_llm["packs"]) == 8
+    assert batch_llm["peak"] == 2
+
+
+def test_disconnected_batch_still_finishes_and_caches(batch_llm):
+    analyzer = DistressAnalyzer(use_prescreen=False)
+    batch_llm["delay"] = 0.05
+
+    async def run():
+        results = analyzer.analyze_many(["late a", "late b"], "u1")
+        first = asyncio.ensure_future(results.__anext__())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await results.aclose()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert analyzer.results.get(content_key("late b")) is not None
+    assert analyzer.stats()["inflight"] == 0
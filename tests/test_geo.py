@@ -0,0 +1,62 @@
+import pytest
+
+from geo import (
+    GeoGridIndex, geohash_bounds, geohash_cell_size, geohash_cover_count, geohash_encode,
+    geohashes_covering, haversine_m, tile_bounds, tile_for, tiles_covering,
+)
+
+
+def test_geohash_known_value_and_prefixes():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash_encode(28.6139, 77.2090, 7).startswith(geohash_encode(28.6139, 77.2090, 5))
+
+
+@pytest.mark.parametrize("lat,lng", [(28.6139, 77.2090), (-33.8688, 151.2093), (0.0, 0.0), (89.9, -179.9)])
+def test_geohash_bounds_contain_the_point(lat, lng):
+    for precision in (4, 5, 6, 7):
+        bounds = geohash_bounds(geohash_encode(lat, lng, precision))
+        assert bounds["south"] <= lat <= bounds["north"]
+        assert bounds["west"] <= lng <= bounds["east"]
+        dlat, dlng = geohash_cell_size(precision)
+        assert bounds["north"] - bounds["south"] == pytest.approx(dlat)
+        assert bounds["east"] - bounds["west"] == pytest.approx(dlng)
+
+
+def test_geohash_cover_matches_count_and_contains_corners():
+    box = (28.55, 77.15, 28.65, 77.25)
+    cells = geohashes_covering(*box, 6)
+    assert len(cells) == len(set(cells)) == geohash_cover_count(*box, 6)
+    for lat in (box[0], box[2]):
+        for lng in (box[1], box[3]):
+            assert geohash_encode(lat, lng, 6) in cells
+
+
+def test_tile_math_round_trips():
+    x, y = tile_for(28.6139, 77.2090, 13)
+    bounds = tile_bounds(13, x, y)
+    assert bounds["south"] <= 28.6139 <= bounds["north"]
+    assert bounds["west"] <= 77.2090 <= bounds["east"]
+
+
+def test_tile_for_clamps_poles_and_antimeridian():
+    assert tile_for(90, 180, 2) == (3, 0)
+    assert tile_for(-90, -180, 2) == (0, 3)
+
+
+def test_tiles_covering_box():
+    tiles = tiles_covering(28.55, 77.15, 28.65, 77.25, 13)
+    assert tile_for(28.6139, 77.2090, 13) in tiles
+    assert len(tiles) == len(set(tiles))
+
+
+def test_grid_index_nearby_is_sorted_and_bounded():
+    index = GeoGridIndex()
+    index.rebuild([
+        ("near", 28.6140, 77.2090, {"name": "near"}),
+        ("mid", 28.6200, 77.2090, {"name": "mid"}),
+        ("far", 28.9000, 77.2090, {"name": "far"}),
+    ])
+    hits = index.nearby(28.6139, 77.2090, 2000)
+    assert [zone["name"] for _, zone in hits] == ["near", "mid"]
+    assert hits[1][0] == pytest.approx(haversine_m(28.6139, 77.2090, 28.6200, 77.2090))
+    assert [zone["name"] for _, zone in index.nearby(28.6139, 77.2090, 2000, limit=1, skip=1)] == ["mid"]
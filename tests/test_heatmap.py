@@ -0,0 +1,66 @@
+import asyncio
+import os
+import struct
+import time
+
+import pytest
+from bson import ObjectId
+
+import heatmap
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def report(i, age=3600):
+    # An _id from `age` seconds ago, as if inserted before the rebuild started.
+    _id = ObjectId(struct.pack(">I", int(time.time()) - age) + os.urandom(5) + struct.pack(">I", i)[1:])
+    return {"_id": _id, "location": {"latitude": 12.9716, "longitude": 77.5946}, "type": "harassment", "severity": 3}
+
+
+async def submit(db, doc):
+    await db.community_reports.insert_one(doc)
+    await heatmap.record_report(db, doc)
+
+
+async def count(db):
+    bucket = await db[heatmap.COLLECTION].find_one({"precision": 4})
+    return bucket["count"] if bucket else 0
+
+
+def test_rebuild_matches_the_reports():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["heatmap_test"]
+        await db.community_reports.insert_many([report(i) for i in range(25)])
+        summary = await heatmap.rebuild(db, batch_size=10)
+        return summary, await count(db)
+
+    summary, total = asyncio.run(run())
+    assert summary == {"reports": 25, "buckets": 4}
+    assert total == 25
+
+
+def test_reports_submitted_during_the_rebuild_survive_the_swap(monkeypatch):
+    fold = heatmap._fold
+    calls = []
+
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["heatmap_test"]
+        await db.community_reports.insert_many([report(i) for i in range(25)])
+
+        async def fold_then_submit(*args, **kwargs):
+            result = await fold(*args, **kwargs)
+            calls.append(args[2:4])
+            if len(calls) <= 2:
+                # Lands after the scan (first call) and after the late fold (second call),
+                # before the swap; the second one used to be lost.
+                await submit(db, {"location": {"latitude": 12.9716, "longitude": 77.5946}, "type": "theft", "severity": 1})
+            return result
+
+        monkeypatch.setattr(heatmap, "_fold", fold_then_submit)
+        await heatmap.rebuild(db, batch_size=10)
+        await submit(db, {"location": {"latitude": 12.9716, "longitude": 77.5946}, "type": "theft", "severity": 1})
+        return await count(db), await db.community_reports.count_documents({})
+
+    rolled_up, stored = asyncio.run(run())
+    assert len(calls) == 3
+    assert rolled_up == stored == 28
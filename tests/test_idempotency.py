@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import server
+from idempotency import TriggerDeduper
+
+
+def test_keys_are_per_user_and_forgotten_on_resolve():
+    dedupe = TriggerDeduper()
+    assert dedupe.lookup("u1", "k1") is None
+    dedupe.remember("u1", "k1", "alert_1")
+    dedupe.remember("u1", None, "ignored")
+    assert dedupe.lookup("u1", "k1") == "alert_1"
+    assert dedupe.lookup("u2", "k1") is None
+    assert dedupe.lookup("u1", None) is None
+    dedupe.forget("u1")
+    assert dedupe.lookup("u1", "k1") is None
+    assert dedupe.stats()["replayed"] == 1
+
+
+def test_lock_serializes_one_user_and_is_dropped_afterwards():
+    dedupe = TriggerDeduper()
+    order = []
+
+    async def tap(user_id, n):
+        async with dedupe.lock(user_id):
+            order.append((user_id, n, "in"))
+            await asyncio.sleep(0.01)
+            order.append((user_id, n, "out"))
+
+    async def run():
+        await asyncio.gather(tap("u1", 1), tap("u1", 2), tap("u2", 1))
+        return dedupe.stats()["locked_users"]
+
+    assert asyncio.run(run()) == 0
+    mine = [step for step in order if step[0] == "u1"]
+    assert mine == [("u1", 1, "in"), ("u1", 1, "out"), ("u1", 2, "in"), ("u1", 2, "out")]
+    # Another user's trigger is not held up by u1's.
+    assert order.index(("u2", 1, "in")) < order.index(("u1", 1, "out"))
+
+
+@pytest.fixture
+def alert_db(monkeypatch):
+    db = pytest.importorskip("mongomock_motor").AsyncMongoMockClient()["trigger_test"]
+    enqueued = []
+
+    async def enqueue(jobs):
+        enqueued.extend(jobs)
+        return len(jobs)
+
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "trigger_dedupe", TriggerDeduper())
+    monkeypatch.setattr(server, "active_alerts", server.ActiveAlertCache())
+    monkeypatch.setattr(server.notification_dispatcher, "enqueue", enqueue)
+    return SimpleNamespace(db=db, enqueued=enqueued)
+
+
+USER = server.User(user_id="user_1", email="asha@example.com", name="Asha", created_at=datetime.now(timezone.utc))
+REQUEST = server.TriggerEmergencyRequest(location={"latitude": 12.97, "longitude": 77.59})
+
+
+def test_duplicate_key_from_another_worker_returns_its_alert(alert_db, monkeypatch):
+    theirs = {**server.EmergencyAlert(user_id=USER.user_id, type="manual", status="active", location=REQUEST.location,
+                                      triggered_at=datetime.now(timezone.utc)).model_dump(), "idempotency_key": "k1"}
+    alerts = alert_db.db.emergency_alerts
+
+    async def insert_one(doc):
+        # The other worker's insert wins the unique (user_id, idempotency_key) index.
+        await alert_db.db.emergency_alerts.insert_one(theirs)
+        raise DuplicateKeyError("E11000 duplicate key error")
+
+    monkeypatch.setattr(server, "db", SimpleNamespace(
+        emergency_contacts=alert_db.db.emergency_contacts,
+        emergency_alerts=SimpleNamespace(insert_one=insert_one, find_one=alerts.find_one),
+    ))
+
+    alert = asyncio.run(server.create_alert(USER, REQUEST, "k1"))
+    assert alert.alert_id == theirs["alert_id"]
+    assert alert_db.enqueued == []
+    assert server.active_alerts.get(USER.user_id) is None
+
+
+def test_concurrent_taps_on_one_worker_create_one_alert(alert_db, monkeypatch):
+    async def current_user(authorization, session_token):
+        return USER
+
+    monkeypatch.setattr(server, "get_current_user", current_user)
+    monkeypatch.setattr(server.trigger_dedupe, "window", 30.0)
+
+    async def run():
+        return await asyncio.gather(*(
+            server.trigger_emergency(REQUEST, server.Response(), idempotency_key=key, authorization=None, session_token=None)
+            for key in ("k1", "k1", "k2", None)
+        ))
+
+    alerts = asyncio.run(run())
+    assert len({alert.alert_id for alert in alerts}) == 1
+    assert asyncio.run(alert_db.db.emergency_alerts.count_documents({})) == 1
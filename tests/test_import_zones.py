@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+from import_zones import import_zones, natural_key, records_for, zone_fields
+from models import SafetyZone
+
+
+async def chunks_of(text, size=7):
+    data = text.encode()
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def parse(fmt, text, size=7):
+    async def collect():
+        return [record async for record in records_for(fmt, chunks_of(text, size))]
+    return asyncio.run(collect())
+
+
+def feature(name, lng, lat, **properties):
+    return {"type": "Feature", "properties": {"name": name, "type": "hospital", **properties},
+            "geometry": {"type": "Point", "coordinates": [lng, lat]}}
+
+
+def test_csv_handles_bom_quoted_newlines_and_split_chunks():
+    text = '﻿Name,Type,Lat,Lng,Address\r\nA,hospital,28.6,77.2,"Line 1\nLine 2"\r\n\r\nB,police_station,28.7,77.3,"Say ""hi"""\r\n'
+    rows = parse("csv", text, size=3)
+    assert [row["name"] for row in rows] == ["A", "B"]
+    assert rows[0]["address"] == "Line 1\nLine 2"
+    assert rows[1]["address"] == 'Say "hi"'
+
+
+def test_geojson_streams_features_across_chunks():
+    text = json.dumps({"type": "FeatureCollection", "features": [feature("A", 77.2, 28.6), feature("B, \"x\"", 77.3, 28.7)]})
+    rows = parse("geojson", text, size=5)
+    assert [(row["name"], row["latitude"], row["longitude"]) for row in rows] == [("A", 28.6, 77.2), ('B, "x"', 28.7, 77.3)]
+
+
+def test_truncated_geojson_is_an_error():
+    text = json.dumps({"type": "FeatureCollection", "features": [feature("A", 77.2, 28.6)]})[:-10]
+    with pytest.raises(ValueError):
+        parse("geojson", text)
+
+
+def test_malformed_features_become_per_row_errors():
+    lines = [json.dumps(feature("A", 77.2, 28.6)), "[1, 2]", '{"geometry": {"type": "Point"}}', "not json"]
+    rows = parse("geojsonl", "\n".join(lines) + "\n")
+    assert rows[0]["name"] == "A"
+    assert all(isinstance(row, ValueError) for row in rows[1:])
+
+
+def test_zone_fields_normalises_and_validates():
+    fields = zone_fields({"name": "A", "type": "hospital", "lat": "28.6", "lon": "77.2",
+                          "facilities": "police; first_aid|", "verified": "no"})
+    assert fields["location"] == {"latitude": 28.6, "longitude": 77.2}
+    assert fields["facilities"] == ["police", "first_aid"]
+    assert fields["verified"] is False
+    with pytest.raises(ValueError):
+        zone_fields({"name": "A", "type": "hospital", "latitude": "95", "longitude": "0"})
+
+
+def test_natural_key_ignores_case_and_spacing():
+    a = {"name": "City  Hospital", "type": "hospital", "location": {"latitude": 28.6, "longitude": 77.2}}
+    b = {"name": "city hospital", "type": "hospital", "location": {"latitude": 28.600001, "longitude": 77.2}}
+    assert natural_key(a) == natural_key(b)
+
+
+def test_dry_run_import_counts_rows_invalid_and_chunks():
+    lines = [json.dumps(feature(f"Z{i}", 77.2, 28.6 + i / 100)) for i in range(5)] + ["[1]", json.dumps(feature("bad", 500, 0))]
+    chunks = []
+
+    async def run():
+        records = records_for("geojsonl", chunks_of("\n".join(lines)))
+        return await import_zones(None, records, SafetyZone, chunk_size=2, dry_run=True, on_chunk=chunks.append)
+
+    summary = asyncio.run(run())
+    assert (summary["rows"], summary["invalid"], summary["inserted"], summary["chunks"]) == (7, 2, 5, 3)
+    assert [error["row"] for error in summary["errors"]] == [6, 7]
+    assert len(chunks) == 3
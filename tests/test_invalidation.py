@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from invalidation import InvalidationFeed
+
+
+@pytest.fixture
+def db():
+    return pytest.importorskip("mongomock_motor").AsyncMongoMockClient()["feed_test"]
+
+
+def test_events_reach_other_workers_once(db):
+    seen = []
+
+    async def run():
+        publisher, worker = InvalidationFeed(db), InvalidationFeed(db)
+        publisher.on("logout", lambda user_id: seen.append(("publisher", user_id)))
+        worker.on("logout", lambda user_id: seen.append(("worker", user_id)))
+        await worker.poll()  # sets the cursor, as the first background poll does
+        await publisher.publish("logout", user_id="u1")
+        applied = [await worker.poll(), await worker.poll(), await publisher.poll()]
+        return applied, worker.stats(), publisher.stats()
+
+    applied, worker_stats, publisher_stats = asyncio.run(run())
+    assert applied == [1, 0, 0]
+    assert seen == [("worker", "u1")]
+    assert worker_stats["applied"] == 1 and publisher_stats["published"] == 1
+
+
+def test_async_handlers_are_awaited_and_failures_do_not_stop_the_rest(db):
+    reloaded = []
+
+    async def reload_zones():
+        await asyncio.sleep(0)
+        reloaded.append(True)
+
+    def broken(**data):
+        raise RuntimeError("boom")
+
+    async def run():
+        publisher, worker = InvalidationFeed(db), InvalidationFeed(db)
+        worker.on("zones", broken)
+        worker.on("zones", reload_zones)
+        await worker.poll()
+        await publisher.publish("zones")
+        await worker.poll()
+        return worker.stats()
+
+    stats = asyncio.run(run())
+    assert reloaded == [True]
+    assert stats["applied"] == 1 and stats["failed"] == 1
+
+
+def test_a_fresh_worker_skips_events_older_than_the_overlap(db):
+    seen = []
+
+    async def run():
+        await db.cache_invalidations.insert_one({
+            "kind": "logout", "data": {"user_id": "old"}, "origin": "elsewhere",
+            "ts": datetime.now(timezone.utc) - timedelta(minutes=10),
+        })
+        await db.cache_invalidations.insert_one({
+            "kind": "logout", "data": {"user_id": "recent"}, "origin": "elsewhere",
+            "ts": datetime.now(timezone.utc) - timedelta(seconds=1),
+        })
+        worker = InvalidationFeed(db, overlap=5.0)
+        worker.on("logout", lambda user_id: seen.append(user_id))
+        await worker.poll()
+
+    asyncio.run(run())
+    assert seen == ["recent"]
+
+
+def test_background_polling_applies_events_until_stopped(db):
+    seen = []
+
+    async def run():
+        publisher, worker = InvalidationFeed(db), InvalidationFeed(db, sync_interval=0.01)
+        worker.on("report", lambda latitude, longitude: seen.append((latitude, longitude)))
+        worker.start()
+        await asyncio.sleep(0.03)
+        await publisher.publish("report", latitude=12.9, longitude=77.6)
+        await asyncio.sleep(0.05)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert seen == [(12.9, 77.6)]
+
+
+def test_profile_refresh_is_broadcast_to_other_workers(db, monkeypatch):
+    import server
+
+    published = []
+
+    class OAuthResponse:
+        status_code = 200
+
+        def json(self):
+            return {"email": "asha@example.com", "name": "Asha R", "picture": "new.png", "session_token": "tok"}
+
+    async def get(url, headers):
+        return OAuthResponse()
+
+    async def broadcast(kind, **data):
+        published.append((kind, data))
+
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "http_client", SimpleNamespace(get=get))
+    monkeypatch.setattr(server, "broadcast", broadcast)
+
+    async def run():
+        await db.users.insert_one({"user_id": "user_1", "email": "asha@example.com", "name": "Asha",
+                                   "picture": "old.png", "created_at": datetime.now(timezone.utc)})
+        await server.exchange_session(x_session_id="sess")
+
+    asyncio.run(run())
+    assert published == [("principal", {"user_id": "user_1"})]
+    assert server.invalidate_principals in server.invalidations._handlers["principal"]
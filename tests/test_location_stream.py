@@ -0,0 +1,111 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from location_stream import LocationHub, LocationWriter
+
+
+class FlakyCollection:
+    def __init__(self):
+        self.fail = 0
+        self.ops = []
+
+    async def bulk_write(self, ops, ordered=True):
+        await asyncio.sleep(0)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("primary stepped down")
+        self.ops.extend(ops)
+
+
+def fake_db():
+    return SimpleNamespace(alert_locations=FlakyCollection(), emergency_alerts=FlakyCollection())
+
+
+def ping(seconds, latitude=12.0):
+    return {"latitude": latitude, "longitude": 77.0, "ts": datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=seconds)}
+
+
+def test_failed_flush_keeps_the_pings_for_the_next_one():
+    db = fake_db()
+    writer = LocationWriter(db, min_interval=0)
+    writer.add("a1", "u1", ping(0, 1.0))
+    writer.add("a1", "u1", ping(5, 2.0))
+    db.alert_locations.fail = 1
+    db.emergency_alerts.fail = 1
+
+    assert asyncio.run(writer.flush()) == 0
+    writer.add("a1", "u1", ping(10, 3.0))
+    assert asyncio.run(writer.flush()) == 3
+
+    assert [op._doc["latitude"] for op in db.alert_locations.ops] == [1.0, 2.0, 3.0]
+    [update] = db.emergency_alerts.ops
+    assert update._doc["$set"]["last_location"]["latitude"] == 3.0
+    assert writer.stats()["requeued"] == 2 and writer.stats()["dropped"] == 0
+
+
+def test_requeue_drops_the_oldest_pings_beyond_max_buffer():
+    db = fake_db()
+
+    async def run():
+        writer = LocationWriter(db, min_interval=0, max_buffer=3)
+        writer.add("a1", "u1", ping(0, 1.0))
+        writer.add("a1", "u1", ping(1, 2.0))
+        db.alert_locations.fail = 1
+        await writer.flush()
+        writer.add("a2", "u2", ping(2, 3.0))
+        assert writer.stats()["buffered"] == 3
+        return writer, await writer.flush()
+
+    writer, written = asyncio.run(run())
+    assert written == 3
+    assert sorted(op._doc["latitude"] for op in db.alert_locations.ops) == [1.0, 2.0, 3.0]
+    assert writer.dropped == 0
+
+
+def test_requeue_within_a_full_buffer_drops_the_oldest():
+    db = fake_db()
+
+    async def run():
+        writer = LocationWriter(db, min_interval=0, max_buffer=3)
+        writer.add("a1", "u1", ping(0, 1.0))
+        writer.add("a1", "u1", ping(1, 2.0))
+        db.alert_locations.fail = 1
+        flushing = asyncio.ensure_future(writer.flush())
+        await asyncio.sleep(0)
+        # Two newer pings arrive while the failing write is in flight.
+        writer.add("a1", "u1", ping(2, 3.0))
+        writer.add("a2", "u2", ping(3, 4.0))
+        await flushing
+        return writer, await writer.flush()
+
+    writer, written = asyncio.run(run())
+    assert written == 3
+    assert sorted(op._doc["latitude"] for op in db.alert_locations.ops) == [2.0, 3.0, 4.0]
+    assert writer.dropped == 1
+
+
+def test_overflow_flush_is_tracked_and_awaited_on_stop():
+    db = fake_db()
+
+    async def run():
+        writer = LocationWriter(db, min_interval=0, max_buffer=2)
+        writer.add("a1", "u1", ping(0))
+        writer.add("a1", "u1", ping(1))
+        assert writer._overflow_task is not None
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.written == 2 and len(db.alert_locations.ops) == 2
+
+
+def test_last_ping_expires_for_alerts_never_resolved(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    hub = LocationHub(last_ttl=60)
+    hub.publish("a1", ping(0))
+    assert "a1" in hub.last
+    now[0] += 61
+    assert "a1" not in hub.last
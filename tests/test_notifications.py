@@ -0,0 +1,45 @@
+import asyncio
+import logging
+
+import pytest
+
+from notifications import FileTransport, LogTransport, LoopbackTransport, Transport, alert_jobs, build_transports, redact
+
+
+def test_redact_masks_phone_numbers_and_emails():
+    assert redact("+91-98765-43210") == "***10"
+    assert redact("asha@example.com") == "a***@example.com"
+    assert redact("112") == "***"
+
+
+def test_log_transport_leaves_out_recipient_and_location(caplog):
+    alert = {"alert_id": "alert_1", "user_id": "user_1", "type": "manual", "status": "active",
+             "location": {"latitude": 12.97, "longitude": 77.59}}
+    contacts = [{"contact_id": "c1", "phone": "+91-98765-43210", "email": "asha@example.com"}]
+    jobs = alert_jobs(alert, {"name": "Asha"}, contacts)
+
+    with caplog.at_level(logging.INFO, logger="notifications"):
+        errors = asyncio.run(LogTransport("sms").send_batch(jobs))
+
+    assert errors == [None, None]
+    assert "98765" not in caplog.text
+    assert "asha@" not in caplog.text
+    assert "12.97" not in caplog.text
+    assert "alert_1" in caplog.text
+
+
+def test_build_transports_rejects_unknown_specs(tmp_path):
+    assert isinstance(build_transports("log")["sms"], LogTransport)
+    assert isinstance(build_transports("loopback")["email"], LoopbackTransport)
+    assert isinstance(build_transports(f"file:{tmp_path / 'out.jsonl'}")["sms"], FileTransport)
+    for spec in ("twilio", "Log", "file:", ""):
+        with pytest.raises(ValueError):
+            build_transports(spec)
+
+
+def test_transport_must_implement_send_batch():
+    class Incomplete(Transport):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
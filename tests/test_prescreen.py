@@ -0,0 +1,36 @@
+import pytest
+
+from prescreen import prescreen
+
+
+@pytest.mark.parametrize("text", [
+    "Call the police, he has a knife",
+    "He is choking me, somebody help",
+])
+def test_urgent_text_is_answered_locally(text):
+    result = prescreen(text)
+    assert result is not None and result["distress_level"] >= 0.85
+
+
+@pytest.mark.parametrize("text", [
+    "I am hiding in the bathroom, he is banging on the door",
+    "He won't let me go",
+    "I can't breathe, he is on top of me",
+    "I think someone put something in my drink",
+    "my ex says he will end me tonight",
+    "Mujhe bachao",
+    "I'm home, he is here",
+    "Traffic is terrible today",
+])
+def test_anything_without_a_benign_signal_goes_to_the_llm(text):
+    assert prescreen(text) is None
+
+
+@pytest.mark.parametrize("text", ["Ok", "Reached office safely", "Running late, will be home by 8", "Hi! Thanks, see you soon"])
+def test_short_small_talk_is_benign(text):
+    assert prescreen(text)["distress_level"] == 0.0
+
+
+def test_hedged_or_long_text_is_escalated():
+    assert prescreen("That movie where he has a knife, lol") is None
+    assert prescreen("ok " * 30) is None
@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+
+from profiling import ProfilingMiddleware, RequestProfiler
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def get(profiler, headers):
+    async def run():
+        app = ProfilingMiddleware(ok_app, profiler=profiler)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/", headers=headers)
+    return asyncio.run(run())
+
+
+def test_matching_token_is_profiled():
+    profiler = RequestProfiler(token="s3cret")
+    response = get(profiler, {"X-Profile-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.headers["x-profile-id"] == profiler.summaries()[0]["profile_id"]
+
+
+def test_malformed_tokens_are_ignored_not_errors():
+    profiler = RequestProfiler(token="s3cret")
+    for value in (b"\xff", "sécret".encode(), b"wrong"):
+        response = get(profiler, [(b"X-Profile-Token", value)])
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+    assert profiler.summaries() == []
+
+
+def test_no_configured_token_profiles_nothing():
+    profiler = RequestProfiler(token=None)
+    response = get(profiler, {"X-Profile-Token": "anything"})
+    assert response.status_code == 200 and "x-profile-id" not in response.headers
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from server import decode_report_cursor, encode_report_cursor
+
+
+def test_cursor_round_trips_to_a_keyset_query():
+    timestamp = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    cursor = encode_report_cursor({"timestamp": timestamp, "report_id": "report_abc"})
+    assert "=" not in cursor
+    assert decode_report_cursor(cursor) == {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "report_id": {"$lt": "report_abc"}},
+        {"timestamp": {"$type": "string"}},
+    ]}
+
+
+def test_legacy_string_timestamps_page_among_the_strings():
+    # Rows not yet converted by migrate_timestamps.py still hold ISO strings.
+    cursor = encode_report_cursor({"timestamp": "2025-06-01T10:00:00+00:00", "report_id": "report_old"})
+    assert decode_report_cursor(cursor) == {"$or": [
+        {"timestamp": {"$lt": "2025-06-01T10:00:00+00:00"}},
+        {"timestamp": "2025-06-01T10:00:00+00:00", "report_id": {"$lt": "report_old"}},
+    ]}
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm90IGpzb24", "WzEsMiwzXQ", "WyJub3QgYSBkYXRlIiwieCJd", "WzEsIngiLCJzIl0"])
+def test_bad_cursors_are_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_report_cursor(cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from response_cache import ResponseCache, etag_matches
+
+
+@pytest.fixture
+def db():
+    return pytest.importorskip("mongomock_motor").AsyncMongoMockClient()["cache_test"]
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+
+
+class Producer:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return f'[{{"call": {self.calls}}}]'.encode(), {"X-Next-Cursor": "c1"}
+
+
+def test_bodies_are_cached_per_params_and_revalidated_with_304(db):
+    produce = Producer()
+
+    async def run():
+        cache = ResponseCache(db, sync_interval=0)
+        first = await cache.serve("community_reports", (50, None), produce, None, 15)
+        again = await cache.serve("community_reports", (50, None), produce, None, 15)
+        other = await cache.serve("community_reports", (10, None), produce, None, 15)
+        revalidated = await cache.serve("community_reports", (50, None), produce, first.headers["etag"], 15)
+        return first, again, other, revalidated, cache
+
+    first, again, other, revalidated, cache = asyncio.run(run())
+    assert produce.calls == 2
+    assert first.body == again.body == b'[{"call": 1}]'
+    assert other.body == b'[{"call": 2}]'
+    assert first.headers["cache-control"] == "public, max-age=15"
+    assert first.headers["x-next-cursor"] == "c1"
+    assert revalidated.status_code == 304 and revalidated.body == b""
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    assert cache.not_modified == 1
+
+
+def test_a_bump_on_another_worker_invalidates_after_sync(db):
+    produce = Producer()
+
+    async def run():
+        mine, theirs = ResponseCache(db, sync_interval=0), ResponseCache(db, sync_interval=0)
+        before = await mine.serve("safety_zones", "verified", produce, None, 300)
+        await theirs.bump("safety_zones")
+        after = await mine.serve("safety_zones", "verified", produce, before.headers["etag"], 300)
+        return before, after, mine
+
+    before, after, mine = asyncio.run(run())
+    assert produce.calls == 2
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert mine.stats()["versions"] == {"safety_zones": 1}
+
+
+def test_versions_are_not_reread_within_the_sync_interval(db):
+    produce = Producer()
+
+    async def run():
+        mine, theirs = ResponseCache(db, sync_interval=60), ResponseCache(db, sync_interval=60)
+        await mine.serve("safety_zones", "verified", produce, None, 300)
+        await theirs.bump("safety_zones")
+        await mine.serve("safety_zones", "verified", produce, None, 300)
+        await mine.bump("safety_zones")  # a local bump applies at once
+        await mine.serve("safety_zones", "verified", produce, None, 300)
+
+    asyncio.run(run())
+    assert produce.calls == 2